@@ -2,6 +2,8 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from core.aggregates import dataset_summary
+from core.watcher import current_version, dataset_copy
 # Change
 st.set_page_config(
     page_title="Twitter Sentiment Dashboard",
@@ -210,14 +212,13 @@ with st.sidebar:
         </style>
     """, unsafe_allow_html=True)
 
-# Load data
+# Load data - landing metrics only, streamed batch by batch so tweet text is never read
 @st.cache_data
-def load_data():
-    df = pd.read_csv("./Data/twitter_dataset.csv")
-    return df
+def load_summary(version):
+    return dataset_summary(copy=dataset_copy(version))
 
 try:
-    df = load_data()
+    summary = load_summary(current_version())
     
     # Header
     st.markdown("""
@@ -258,7 +259,7 @@ try:
         st.markdown(f"""
             <div class='metric-container'>
                 <div class='metric-label'>Total Conversations</div>
-                <div class='metric-value'>{len(df):,}</div>
+                <div class='metric-value'>{summary['rows']:,}</div>
                 <div style='color: #657786; font-size: 0.85em; margin-top: 5px;'>tweets analyzed</div>
             </div>
         """, unsafe_allow_html=True)
@@ -267,7 +268,7 @@ try:
         st.markdown(f"""
             <div class='metric-container'>
                 <div class='metric-label'>Unique Voices</div>
-                <div class='metric-value'>{df['Username'].nunique():,}</div>
+                <div class='metric-value'>{summary['users']:,}</div>
                 <div style='color: #657786; font-size: 0.85em; margin-top: 5px;'>participants</div>
             </div>
         """, unsafe_allow_html=True)
@@ -276,7 +277,7 @@ try:
         st.markdown(f"""
             <div class='metric-container'>
                 <div class='metric-label'>Expressions of Support</div>
-                <div class='metric-value'>{df['Likes'].sum():,.0f}</div>
+                <div class='metric-value'>{summary['likes']:,.0f}</div>
                 <div style='color: #657786; font-size: 0.85em; margin-top: 5px;'>total likes</div>
             </div>
         """, unsafe_allow_html=True)
@@ -285,7 +286,7 @@ try:
         st.markdown(f"""
             <div class='metric-container'>
                 <div class='metric-label'>Message Amplification</div>
-                <div class='metric-value'>{df['Retweets'].sum():,.0f}</div>
+                <div class='metric-value'>{summary['retweets']:,.0f}</div>
                 <div style='color: #657786; font-size: 0.85em; margin-top: 5px;'>times shared</div>
             </div>
         """, unsafe_allow_html=True)
@@ -351,7 +352,7 @@ try:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        avg_likes = df['Likes'].mean()
+        avg_likes = summary['likes'] / summary['rows']
         st.markdown(f"""
             <div class='metric-container'>
                 <div class='metric-label'>Average Appreciation</div>
@@ -361,7 +362,7 @@ try:
         """, unsafe_allow_html=True)
     
     with col2:
-        avg_retweets = df['Retweets'].mean()
+        avg_retweets = summary['retweets'] / summary['rows']
         st.markdown(f"""
             <div class='metric-container'>
                 <div class='metric-label'>Average Reach</div>
@@ -371,7 +372,7 @@ try:
         """, unsafe_allow_html=True)
     
     with col3:
-        date_range = f"{df['Timestamp'].min()[:10]} to {df['Timestamp'].max()[:10]}"
+        date_range = f"{summary['first']:%Y-%m-%d} to {summary['last']:%Y-%m-%d}"
         st.markdown(f"""
             <div class='metric-container'>
                 <div class='metric-label'>Analysis Period</div>
@@ -0,0 +1 @@
+# core - shared data loading and scoring used by Home.py and the pages
@@ -0,0 +1,354 @@
+# core/aggregates.py - Out-of-core aggregates the dashboard pages render from
+#
+# Streams the dataset and its features one record batch at a time and folds
+# each batch into mergeable partial aggregates: grouped counts and sums,
+# moments, a bounded random sample and a top-N by likes. Memory is bounded by
+# the number of distinct groups (days x hours, users, words ...), not by the
+# number of rows, so pages can render datasets far larger than RAM.
+#
+# The aggregates record which dataset parts (core.dataset) they cover, so rows
+# appended to the CSV are folded into the stored aggregates instead of
+# rebuilding them.
+#
+# Sentiment is not fixed when the aggregates are built: rows are grouped by a
+# polarity code (score_code) that the sidebar thresholds are applied to
+# when a page reads a table (Aggregates.labelled). Word counts are also kept
+# as a sparse matrix of polarity codes by words (Aggregates.terms), so a
+# sentiment's word frequencies are a row mask and a column sum. Bigrams and
+# trigrams are counted in a store of their own (core.phrases), so pages that
+# don't show them don't pay for building or loading them.
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from scipy import sparse
+
+from core.backends import backend_id
+from core.config import CACHE_DIR, DATA_PATH
+from core.dataset import ingest, iter_batches, prune, temp_path
+from core.feature_store import iter_features
+from core.schema import SENTIMENT_DTYPE, TEXT_DTYPE
+
+COLUMNS = ['Username', 'Text', 'Retweets', 'Likes', 'Timestamp',
+           'Polarity', 'Subjectivity', 'Cleaned_Text', 'Text_Length']
+# Bumped whenever the tables below change, so older aggregates are rebuilt
+AGGREGATES_VERSION = 7
+
+# Thresholds are resolved on this grid (the sidebar slider's 0.01 step)
+GRID = np.round(np.linspace(-1.0, 1.0, 201), 2)
+# Number of distinct score codes
+CODES = 2 * len(GRID) - 1
+SAMPLE_ROWS = 20_000
+SAMPLE_COLUMNS = ['Username', 'Text', 'Likes', 'Retweets', 'Polarity', 'Subjectivity', 'Text_Length']
+TOP_ROWS = 10
+# Rows whose words are split and counted at once (splitting a whole batch
+# takes more memory than the rest of the aggregates together)
+WORD_ROWS = 10_000
+# Partial tables are summed together once this many have piled up
+COMPACT_EVERY = 16
+
+# name -> (group keys, summed columns). Rows without a Timestamp are only
+# left out of 'time'
+TABLES = {
+    'codes': (['Code'], ['Tweets', 'Likes', 'Retweets']),
+    'time': (['Date', 'Hour', 'Code'], ['Tweets', 'Likes', 'Retweets']),
+    'users': (['Username', 'Code'], ['Tweets', 'Likes', 'Retweets']),
+    'subjectivity': (['Subjectivity_Code'], ['Tweets']),
+    'lengths': (['Text_Length', 'Code'], ['Tweets']),
+    'likes': (['Likes'], ['Tweets']),
+    'retweets': (['Retweets'], ['Tweets']),
+    'words': (['Word', 'Code'], ['Count']),
+}
+
+
+def score_code(values):
+    """Code scores against GRID: 2i for exactly GRID[i], 2i - 1 for between GRID[i - 1] and GRID[i].
+
+    Comparing codes with 2i reproduces ``value > GRID[i]`` and
+    ``value < GRID[i]`` exactly, which is all sentiment labelling needs.
+    """
+    values = np.clip(np.asarray(values, dtype=float), -1.0, 1.0)
+    index = np.searchsorted(GRID, values, side='left')
+    return (2 * index - (GRID[index] != values)).astype(np.int16)
+
+
+def code_value(codes):
+    """Score a code stands for: its grid point, or the midpoint between two."""
+    return np.asarray(codes) / (len(GRID) - 1) - 1
+
+
+def grid_code(threshold):
+    return 2 * int(np.abs(GRID - threshold).argmin())
+
+
+def label_codes(codes, negative, positive):
+    codes = np.asarray(codes)
+    labels = np.select([codes > grid_code(positive), codes < grid_code(negative)], [2, 0], default=1)
+    return pd.Categorical.from_codes(labels, dtype=SENTIMENT_DTYPE)
+
+
+def code_range(negative=None, positive=None, sentiment=None):
+    """Codes [lo, hi) that label_codes labels ``sentiment``, all of them if None."""
+    if sentiment is None:
+        return 0, CODES
+    return {'Negative': (0, grid_code(negative)),
+            'Neutral': (grid_code(negative), grid_code(positive) + 1),
+            'Positive': (grid_code(positive) + 1, CODES)}[sentiment]
+
+
+def weighted_median(values, counts):
+    """Median of ``values`` each repeated ``counts`` times (the two middle values averaged)."""
+    order = np.argsort(values)
+    values, cumulative = np.asarray(values)[order], np.cumsum(np.asarray(counts)[order])
+    if not len(values) or cumulative[-1] == 0:
+        return np.nan
+    middle = (cumulative[-1] - 1) / 2
+    lower = values[np.searchsorted(cumulative, np.floor(middle) + 1)]
+    upper = values[np.searchsorted(cumulative, np.ceil(middle) + 1)]
+    return (lower + upper) / 2
+
+
+class Aggregates:
+    def __init__(self, seed=0):
+        self.rows = 0
+        # Dataset parts folded in so far, in order
+        self.parts = []
+        # Mean and sum of squared deviations from it (M2) rather than a sum of
+        # squares, which cancels catastrophically for large, clustered values
+        self.moments = {column: {'sum': 0.0, 'mean': 0.0, 'm2': 0.0, 'min': np.inf, 'max': -np.inf}
+                        for column in ('Polarity', 'Subjectivity', 'Likes', 'Retweets', 'Text_Length')}
+        self.first = self.last = pd.NaT
+        self.sample = None
+        self.top = None
+        self._parts = {name: [] for name in TABLES}
+        self._rng = np.random.default_rng(seed)
+        self._terms = None
+
+    def _add(self, name, table):
+        parts = self._parts[name]
+        parts.append(table)
+        if len(parts) >= COMPACT_EVERY:
+            self._parts[name] = [self._sum(parts)]
+
+    @staticmethod
+    def _sum(parts):
+        combined = pd.concat(parts)
+        return combined.groupby(level=list(range(combined.index.nlevels)), sort=False, observed=True).sum()
+
+    def _group(self, name, frame):
+        keys, values = TABLES[name]
+        self._add(name, frame.groupby(keys, sort=False, observed=True)[values].sum())
+
+    def update(self, chunk):
+        """Fold one batch of rows (with COLUMNS) into the aggregates."""
+        if not len(chunk):
+            return self
+        seen, added = self.rows, len(chunk)
+        self.rows += added
+        self._terms = None
+        for column, moments in self.moments.items():
+            values = chunk[column].to_numpy(dtype=float)
+            # Chan et al.'s parallel update: merge this batch's mean and M2 into the running ones
+            mean = values.mean()
+            delta = mean - moments['mean']
+            moments['sum'] += values.sum()
+            moments['mean'] += delta * added / self.rows
+            moments['m2'] += ((values - mean) ** 2).sum() + delta ** 2 * seen * added / self.rows
+            moments['min'] = min(moments['min'], values.min())
+            moments['max'] = max(moments['max'], values.max())
+        self.first = min(self.first, chunk['Timestamp'].min()) if pd.notna(self.first) else chunk['Timestamp'].min()
+        self.last = max(self.last, chunk['Timestamp'].max()) if pd.notna(self.last) else chunk['Timestamp'].max()
+
+        rows = pd.DataFrame({
+            'Date': chunk['Timestamp'].dt.normalize(),
+            # Nullable, so grouping drops rows without a Timestamp
+            'Hour': chunk['Timestamp'].dt.hour.astype('Int8'),
+            'Code': score_code(chunk['Polarity']),
+            'Subjectivity_Code': score_code(chunk['Subjectivity']),
+            'Username': chunk['Username'].astype(str),
+            'Text_Length': chunk['Text_Length'],
+            'Tweets': 1,
+            'Likes': chunk['Likes'].astype(np.int64),
+            'Retweets': chunk['Retweets'].astype(np.int64),
+        }, index=chunk.index)
+        for name in ('codes', 'time', 'users', 'subjectivity', 'lengths', 'likes', 'retweets'):
+            self._group(name, rows)
+
+        texts, codes = chunk['Cleaned_Text'], rows['Code'].to_numpy()
+        for start in range(0, len(chunk), WORD_ROWS):
+            end = start + WORD_ROWS
+            self._add('words', self._word_counts(texts.iloc[start:end], codes[start:end]))
+
+        # Bottom-k of a random key per row is a uniform sample, and mergeable
+        sample = chunk[SAMPLE_COLUMNS].assign(_key=self._rng.random(len(chunk)))
+        sample['Username'] = sample['Username'].astype(str)
+        self.sample = sample if self.sample is None else pd.concat([self.sample, sample])
+        self.sample = self.sample.nsmallest(SAMPLE_ROWS, '_key')
+        top = chunk[['Text', 'Likes', 'Retweets', 'Polarity', 'Username']].assign(
+            Username=lambda df: df['Username'].astype(str))
+        self.top = top if self.top is None else pd.concat([self.top, top])
+        self.top = self.top.nlargest(TOP_ROWS, 'Likes')
+        return self
+
+    @staticmethod
+    def _word_counts(texts, codes):
+        # Split in Arrow and count (word, code) pairs as integer keys: a Python
+        # string per word would take several times the texts' own memory
+        lists = pc.utf8_split_whitespace(pa.array(texts))
+        if isinstance(lists, pa.ChunkedArray):
+            # Arrow-backed texts from more than one record batch
+            lists = lists.combine_chunks()
+        words = pc.list_flatten(lists)
+        keep = pc.not_equal(words, '')
+        words = words.filter(keep).dictionary_encode()
+        parents = pc.list_parent_indices(lists).filter(keep).to_numpy()
+        keys = words.indices.to_numpy().astype(np.int64) * CODES + codes[parents]
+        counts = pd.Series(keys).value_counts(sort=False)
+        keys = counts.index.to_numpy()
+        return pd.DataFrame({'Count': counts.to_numpy()}, index=pd.MultiIndex.from_arrays(
+            [pd.array(words.dictionary.take(keys // CODES), dtype=TEXT_DTYPE),
+             (keys % CODES).astype(np.int16)], names=['Word', 'Code']))
+
+    def table(self, name):
+        """The summed table ``name`` from TABLES, indexed by its group keys."""
+        keys, values = TABLES[name]
+        parts = self._parts[name]
+        if not parts:
+            return pd.DataFrame(columns=values, index=pd.MultiIndex.from_arrays([[]] * len(keys), names=keys))
+        if len(parts) > 1:
+            self._parts[name] = parts = [self._sum(parts)]
+        return parts[0]
+
+    def labelled(self, name, negative, positive):
+        """table(name) with its polarity Code replaced by a Sentiment label for the given thresholds."""
+        table = self.table(name)
+        keys = [key for key in table.index.names if key != 'Code']
+        labels = pd.Series(label_codes(table.index.get_level_values('Code'), negative, positive),
+                           index=table.index, name='Sentiment')
+        by = [table.index.get_level_values(key) for key in keys] + [labels]
+        return table.groupby(by, observed=True).sum()
+
+    def sentiment_counts(self, negative, positive):
+        """Rows per Sentiment label, like ``value_counts()`` on the labelled frame."""
+        counts = self.labelled('codes', negative, positive)['Tweets']
+        return counts.rename('count').sort_values(ascending=False)
+
+    def terms(self):
+        """(matrix, vocabulary): the words table as a sparse CODES x words matrix of counts.
+
+        Row c counts the Cleaned_Text words of rows with polarity code c;
+        columns follow ``vocabulary``, in first-seen order.
+        """
+        if self._terms is None:
+            counts = self.table('words')['Count']
+            words, vocabulary = pd.factorize(counts.index.get_level_values('Word'))
+            codes = counts.index.get_level_values('Code').to_numpy()
+            matrix = sparse.csr_matrix((counts.to_numpy(), (codes, words)), shape=(CODES, len(vocabulary)))
+            self._terms = matrix, pd.Index(vocabulary, dtype=TEXT_DTYPE, name='Word')
+        return self._terms
+
+    def word_counts(self, negative=None, positive=None, sentiment=None):
+        """Occurrences of each Cleaned_Text word, in first-seen order; only in rows labelled ``sentiment`` if given.
+
+        Words missing from those rows are left out; the rest keep their
+        first-seen order in the whole dataset.
+        """
+        matrix, vocabulary = self.terms()
+        rows = np.ones(CODES, dtype=np.int64)
+        if sentiment is not None:
+            rows = (label_codes(np.arange(CODES), negative, positive) == sentiment).astype(np.int64)
+        counts = matrix.T @ rows
+        present = counts > 0
+        return pd.Series(counts[present], index=vocabulary[present], name='Count')
+
+    def _code_counts(self, column):
+        if column == 'Polarity':
+            return self.table('codes')['Tweets']
+        return self.table('subjectivity')['Tweets']
+
+    def stats(self, column):
+        """sum, mean, std, min and max of a column, like the pandas methods; median too for
+        Polarity and Subjectivity, exact when it falls on the 0.01 grid and
+        otherwise within 0.005."""
+        moments = self.moments[column]
+        n = self.rows
+        mean = moments['mean'] if n else np.nan
+        variance = moments['m2'] / (n - 1) if n > 1 else np.nan
+        stats = {'sum': moments['sum'], 'mean': mean, 'std': np.sqrt(variance),
+                 'min': moments['min'], 'max': moments['max']}
+        if column in ('Polarity', 'Subjectivity'):
+            counts = self._code_counts(column)
+            stats['median'] = weighted_median(code_value(counts.index.to_numpy()), counts.to_numpy())
+        return stats
+
+    def histogram(self, column):
+        """Row counts per value of Polarity or Subjectivity (resolved to the 0.01 grid)."""
+        counts = self._code_counts(column)
+        return pd.Series(counts.to_numpy(), index=code_value(counts.index.to_numpy()), name=column).sort_index()
+
+    def __getstate__(self):
+        for name in TABLES:
+            self.table(name)
+        return self.__dict__
+
+
+def dataset_summary(path=DATA_PATH, cache_dir=CACHE_DIR, copy=None):
+    """Row count, distinct users, like/retweet totals and time span, without scoring or reading text.
+
+    ``copy`` is the (directory, manifest) of the version to summarize, if not
+    the CSV as it is now.
+    """
+    rows = likes = retweets = 0
+    users = set()
+    first = last = None
+    directory, manifest = copy or ingest(path, cache_dir)
+    for batch in iter_batches(directory, manifest['parts'], ['Username', 'Likes', 'Retweets', 'Timestamp']):
+        rows += len(batch)
+        users.update(batch['Username'].unique())
+        likes += int(batch['Likes'].sum())
+        retweets += int(batch['Retweets'].sum())
+        first = batch['Timestamp'].min() if first is None else min(first, batch['Timestamp'].min())
+        last = batch['Timestamp'].max() if last is None else max(last, batch['Timestamp'].max())
+    return {'rows': rows, 'users': len(users), 'likes': likes, 'retweets': retweets,
+            'first': first, 'last': last}
+
+
+def aggregates_path(dataset_id, cache_dir=CACHE_DIR, backend=None):
+    backend = backend or backend_id()
+    return os.path.join(cache_dir, f"aggregates-{backend}-{dataset_id}.v{AGGREGATES_VERSION}.pkl")
+
+
+def load_aggregates(path=DATA_PATH, cache_dir=CACHE_DIR, copy=None):
+    """Aggregates of the whole dataset, built by streaming it the first time.
+
+    Parts appended to the dataset since are streamed and folded into the
+    stored aggregates, which are then saved again. ``copy`` is the
+    (directory, manifest) of the version to aggregate, if not the CSV as it
+    is now.
+    """
+    copy = copy or ingest(path, cache_dir)
+    manifest = copy[1]
+    parts = manifest['parts']
+    store = aggregates_path(manifest['id'], cache_dir)
+    aggregates = None
+    if os.path.exists(store):
+        with open(store, 'rb') as f:
+            aggregates = pickle.load(f)
+        if aggregates.parts == parts:
+            return aggregates
+    if aggregates is None or aggregates.parts != parts[:len(aggregates.parts)]:
+        aggregates = Aggregates()
+
+    for frame in iter_features(COLUMNS, path, cache_dir, parts=parts[len(aggregates.parts):], copy=copy):
+        aggregates.update(frame)
+    aggregates.parts = list(parts)
+    aggregates.terms()
+    tmp = temp_path(store)
+    with open(tmp, 'wb') as f:
+        pickle.dump(aggregates, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, store)
+    prune(store, cache_dir)
+    return aggregates
@@ -0,0 +1,113 @@
+# core/backends.py - Interchangeable sentiment scoring backends
+#
+# Every backend has a ``name`` and a ``score(texts)`` method returning the
+# Polarity, Subjectivity and Sentiment columns that sentiment.score_texts
+# returns. The dashboard uses the one named by config.SENTIMENT_BACKEND.
+#
+# Its ``id`` names what its scores depend on, and every cache of scores (the
+# score cache, feature stores, aggregates, word clouds) is keyed on it: the
+# name, or for the distilled model the name and a hash of the model file, so
+# scores of a model are never served once core.distill has retrained it.
+import hashlib
+import io
+import os
+import threading
+
+from core.config import DISTILLED_MODEL_PATH, SENTIMENT_BACKEND
+from core.dataset import load_dataset
+from core.lexicon import LexiconScorer
+from core.sentiment import score_texts
+
+
+class TextBlobBackend:
+    """Reference scores: TextBlob's pattern analyzer, one text at a time."""
+    name = 'textblob'
+    id = name
+
+    def score(self, texts):
+        return score_texts(texts)
+
+
+class LexiconBackend:
+    """TextBlob's lexicon and rules evaluated over the whole batch with NumPy."""
+    name = 'lexicon'
+    id = name
+
+    def __init__(self):
+        self.scorer = LexiconScorer()
+
+    def score(self, texts):
+        return self.scorer.score(texts)
+
+
+class LinearBackend:
+    """Distilled scikit-learn model (core.distill) trained on TextBlob labels."""
+    name = 'linear'
+
+    def __init__(self, model_path=DISTILLED_MODEL_PATH):
+        self.model_path = model_path
+        self.model = None
+        self._stat = None
+        self._hash = None
+        self._lock = threading.Lock()
+
+    @property
+    def id(self):
+        """'linear-' and a hash of the model file, e.g. 'linear-3f2a9c0d1b4e'."""
+        self._load()
+        return f"{self.name}-{self._hash[:12]}"
+
+    def fit(self, texts):
+        # core.distill scores its teacher labels through the score cache,
+        # which imports this module
+        from core.distill import train_model
+
+        with self._lock:
+            self.model = train_model(texts)[0]
+            # Not the model file's: never replaced by it
+            self.model_path, self._hash = None, 'fitted'
+        return self
+
+    def _load(self):
+        # Load the model, again whenever its file changes (retrained by core.distill)
+        from core.distill import load_model, save_model, train_model
+
+        with self._lock:
+            if self.model_path is None:
+                return
+            if not os.path.exists(self.model_path):
+                save_model(train_model(load_dataset(['Text'])['Text'])[0], self.model_path)
+            stat = os.stat(self.model_path)
+            stat = (stat.st_size, stat.st_mtime_ns)
+            if stat != self._stat:
+                # Hash and load the same bytes, in case the file is replaced meanwhile
+                with open(self.model_path, 'rb') as f:
+                    data = f.read()
+                self.model = load_model(io.BytesIO(data))
+                self._hash = hashlib.sha256(data).hexdigest()
+                self._stat = stat
+
+    def score(self, texts):
+        if self.model is None:
+            self._load()
+        return self.model.predict(texts)
+
+
+BACKENDS = {backend.name: backend for backend in (TextBlobBackend, LexiconBackend, LinearBackend)}
+
+_instances = {}
+
+
+def get_backend(name=None):
+    """Return the shared instance of a backend (default: config.SENTIMENT_BACKEND)."""
+    name = name or SENTIMENT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown sentiment backend {name!r}; choose from {', '.join(BACKENDS)}")
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
+
+
+def backend_id(name=None):
+    """``id`` of a backend (default: config.SENTIMENT_BACKEND), the key of every cache of its scores."""
+    return get_backend(name).id
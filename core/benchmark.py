@@ -0,0 +1,248 @@
+# core/benchmark.py - Timing comparisons for the scoring pipeline
+#
+# Usage: python -m core.benchmark [scoring|backends|service|memory|text] [--data path/to/dataset.csv]
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from textblob import TextBlob
+
+from core.backends import BACKENDS
+from core.config import DATA_PATH
+from core.dataset import read_source
+from core.lexicon import TOLERANCE, LexiconScorer
+from core.schema import apply_schema, frame_memory
+from core.sentiment import label_sentiment, score_texts, with_sentiment
+from core.service import make_server
+from core.text import clean_texts
+
+
+def legacy_score(texts):
+    # The per-page loader this replaced: up to four TextBlob parses per row
+    df = pd.DataFrame({'Text': texts})
+    df['Sentiment'] = df['Text'].apply(lambda x: 'Positive' if TextBlob(str(x)).sentiment.polarity > 0.1
+                                       else ('Negative' if TextBlob(str(x)).sentiment.polarity < -0.1 else 'Neutral'))
+    df['Polarity'] = df['Text'].apply(lambda x: TextBlob(str(x)).sentiment.polarity)
+    df['Subjectivity'] = df['Text'].apply(lambda x: TextBlob(str(x)).sentiment.subjectivity)
+    return df
+
+
+def legacy_clean(text):
+    # The cleaner clean_texts replaced: five substitutions, then a split to join
+    # and another to count the words
+    text = str(text).lower()
+    text = re.sub(r'@\w+', '', text)
+    text = re.sub(r'#\w+', '', text)
+    text = re.sub(r'http\S+', '', text)
+    text = re.sub(r'\d+', '', text)
+    text = re.sub(r'[^\w\s]', '', text)
+    return ' '.join(text.split())
+
+
+def legacy_clean_texts(texts):
+    """(Cleaned_Text, Text_Length) the way the loader clean_texts replaced computed them."""
+    cleaned = texts.apply(legacy_clean)
+    return cleaned, cleaned.apply(lambda x: len(x.split()))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _compare_cleaning(texts, label):
+    _, before_s = timed(legacy_clean_texts, texts)
+    _, after_s = timed(clean_texts, texts)
+    print(f"Cleaning {len(texts):,} texts {label} (Cleaned_Text and Text_Length)")
+    print(f"  legacy (5 re.sub + 2 splits/row): {before_s:8.2f}s  ({len(texts) / before_s:10,.0f} rows/s)")
+    print(f"  clean_texts (1 split/row):        {after_s:8.2f}s  ({len(texts) / after_s:10,.0f} rows/s, "
+          f"{before_s / after_s:.1f}x faster)")
+
+
+def bench_cleaning(texts, rows=1_000_000):
+    # Tile the dataset up to ``rows`` rows; every text is still cleaned, no
+    # dedup. tests/test_text.py checks the output is the same as legacy_clean's
+    texts = texts.iloc[np.resize(np.arange(len(texts)), rows)].reset_index(drop=True)
+    _compare_cleaning(texts, "as is")
+    # Real tweets are full of mentions, hashtags and links, which take the regex path
+    _compare_cleaning(texts.astype(str) + " @user #tag http://t.co/x1y2", "with a mention, hashtag and link each")
+
+
+def bench_single_pass(texts):
+    before, before_s = timed(legacy_score, texts)
+    after, after_s = timed(score_texts, texts)
+    same = (before['Sentiment'].values == after['Sentiment'].values).all() \
+        and (before['Polarity'].values == after['Polarity'].values).all()
+    print(f"Scoring {len(texts):,} texts")
+    print(f"  legacy loader (4 parses/row): {before_s:8.2f}s")
+    print(f"  score_texts   (1 parse/row):  {after_s:8.2f}s  ({before_s / after_s:.1f}x faster)")
+    print(f"  identical output: {same}")
+
+
+def bench_workers(texts):
+    print(f"Parallel scoring of {len(texts):,} texts")
+    serial, serial_s = timed(score_texts, texts, 1)
+    print(f"  1 worker:  {len(texts) / serial_s:10,.0f} rows/s")
+    for workers in range(2, (os.cpu_count() or 1) + 1):
+        parallel, parallel_s = timed(score_texts, texts, workers)
+        print(f"  {workers} workers: {len(texts) / parallel_s:10,.0f} rows/s"
+              f"  ({serial_s / parallel_s:.1f}x, identical: {parallel.equals(serial)})")
+
+
+def bench_lexicon(texts):
+    reference, reference_s = timed(score_texts, texts, 1)
+    scorer = LexiconScorer()
+    vectorized, vectorized_s = timed(scorer.score, texts)
+    error = max((vectorized['Polarity'] - reference['Polarity']).abs().max(),
+                (vectorized['Subjectivity'] - reference['Subjectivity']).abs().max())
+    agreement = (vectorized['Sentiment'] == reference['Sentiment']).mean()
+    print(f"Lexicon engine on {len(texts):,} texts")
+    print(f"  TextBlob:      {reference_s:8.2f}s")
+    print(f"  LexiconScorer: {vectorized_s:8.2f}s  ({reference_s / vectorized_s:.1f}x faster)")
+    print(f"  max abs error: {error:.2e} (tolerance {TOLERANCE:.0e}), label agreement: {agreement:.2%}")
+
+
+def bench_backends(texts, names, latency_sample=200):
+    # Agreement is measured on the odd rows; backends that learn from TextBlob
+    # are fitted on the even rows first so they are not scored on their own
+    # training data
+    train, held_out = texts.iloc[::2], texts.iloc[1::2]
+    reference = None
+    print(f"Backends on {len(texts):,} texts (agreement on {len(held_out):,} held-out texts)")
+    print(f"  {'backend':<10}{'rows/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'peak MiB':>10}{'agreement':>11}")
+    for name in names:
+        backend = BACKENDS[name]()
+        if hasattr(backend, 'fit'):
+            backend.fit(train)
+        backend.score(texts.iloc[:10])
+
+        scores, elapsed = timed(backend.score, texts)
+        labels = scores['Sentiment'].iloc[1::2].to_numpy()
+        if reference is None:
+            reference = BACKENDS['textblob']().score(held_out)['Sentiment'].to_numpy() \
+                if name != 'textblob' else labels
+
+        latencies = []
+        for text in texts.iloc[:latency_sample]:
+            latencies.append(timed(backend.score, [text])[1] * 1000)
+
+        tracemalloc.start()
+        backend.score(texts)
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+        print(f"  {name:<10}{len(texts) / elapsed:12,.0f}{np.percentile(latencies, 50):10.2f}"
+              f"{np.percentile(latencies, 99):10.2f}{peak:10.1f}{(labels == reference).mean():11.2%}")
+
+
+def _post(url, texts):
+    request = urllib.request.Request(url, data=json.dumps({'texts': texts}).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_service(texts, url=None, concurrency=16, n_requests=2000, texts_per_request=1, target_p99_ms=50.0):
+    # Without --url an in-process service on a free port is started, so the
+    # load generator shares its CPU; point it at a separate
+    # python -m core.service for cleaner numbers
+    server = None
+    if url is None:
+        server = make_server(port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+    values = texts.astype(str).tolist()
+    payloads = [[values[(i * texts_per_request + j) % len(values)] for j in range(texts_per_request)]
+                for i in range(n_requests)]
+    _post(f"{url}/score", payloads[0])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(lambda payload: _post(f"{url}/score", payload), payloads)))
+    elapsed = time.perf_counter() - start
+    with urllib.request.urlopen(f"{url}/stats") as response:
+        stats = json.loads(response.read())
+    if server is not None:
+        server.shutdown()
+
+    p99 = np.percentile(latencies, 99)
+    print(f"Service at {url}: {n_requests:,} requests x {texts_per_request} texts, {concurrency} concurrent clients")
+    print(f"  throughput: {n_requests / elapsed:,.0f} requests/s, {n_requests * texts_per_request / elapsed:,.0f} texts/s")
+    print(f"  latency ms: p50 {np.percentile(latencies, 50):.2f}, p90 {np.percentile(latencies, 90):.2f}, "
+          f"p99 {p99:.2f} (target {target_p99_ms:.0f}: {'met' if p99 <= target_p99_ms else 'MISSED'})")
+    print(f"  batches: {stats['batches']:,}, mean size {stats['mean_batch_size']:.1f}, "
+          f"largest {stats['largest_batch']}, queue depth now {stats['queue_depth']}")
+    return p99 <= target_p99_ms
+
+
+def bench_memory(path):
+    # The frame as the pages used to build it: object strings, int64 counts
+    # and a string Sentiment column
+    before = pd.read_csv(path).astype({'Username': object, 'Text': object, 'Timestamp': object})
+    before['Sentiment'] = pd.Series(label_sentiment(score_texts(before['Text'])['Polarity']), dtype=object)
+    after = read_source(path)
+    after['Polarity'] = score_texts(after['Text'])['Polarity']
+    after = with_sentiment(apply_schema(after)).drop(columns=['Polarity'])
+
+    before_usage = before.memory_usage(deep=True, index=False)
+    after_usage = after.memory_usage(deep=True, index=False)
+    print(f"memory_usage(deep=True) of {len(before):,} rows, MiB")
+    print(f"  {'column':<12}{'before':>10}{'after':>10}  dtype")
+    for column in before.columns:
+        print(f"  {column:<12}{before_usage[column] / 2 ** 20:10.3f}{after_usage[column] / 2 ** 20:10.3f}"
+              f"  {before[column].dtype} -> {after[column].dtype}")
+    print(f"  {'total':<12}{frame_memory(before) / 2 ** 20:10.3f}{frame_memory(after) / 2 ** 20:10.3f}"
+          f"  ({1 - frame_memory(after) / frame_memory(before):.0%} smaller)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.benchmark",
+                                     description="Benchmark the sentiment scoring pipeline.")
+    parser.add_argument('suite', nargs='?', choices=['scoring', 'backends', 'service', 'memory', 'text'],
+                        default='scoring',
+                        help="scoring: loader/pool/lexicon speedups; backends: compare scoring backends; "
+                             "service: load-test the HTTP scoring service; memory: compact schema footprint; "
+                             "text: single-pass cleaner speedup over the old one (parity is in tests/test_text.py)")
+    parser.add_argument('--data', default=DATA_PATH, help="CSV with a Text column")
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument('--latency-sample', type=int, default=200,
+                        help="texts scored one at a time for the latency percentiles")
+    parser.add_argument('--url', help="service to load-test (default: start one in-process)")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--texts-per-request', type=int, default=1)
+    parser.add_argument('--target-p99-ms', type=float, default=50.0)
+    parser.add_argument('--rows', type=int, default=1_000_000, help="texts cleaned by the text suite")
+    args = parser.parse_args(argv)
+
+    if args.suite == 'memory':
+        bench_memory(args.data)
+        return
+    texts = pd.read_csv(args.data, usecols=['Text'])['Text']
+    if args.suite == 'backends':
+        bench_backends(texts, args.backends, args.latency_sample)
+    elif args.suite == 'text':
+        bench_cleaning(texts, args.rows)
+    elif args.suite == 'service':
+        met = bench_service(texts, args.url, args.concurrency, args.requests,
+                            args.texts_per_request, args.target_p99_ms)
+        raise SystemExit(0 if met else 1)
+    else:
+        bench_single_pass(texts)
+        bench_workers(texts)
+        bench_lexicon(texts)
+
+
+if __name__ == "__main__":
+    main()
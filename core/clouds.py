@@ -0,0 +1,84 @@
+# core/clouds.py - Word cloud images, rendered once per dataset version and kept on disk
+#
+# Laying out a word cloud takes seconds, more than the rest of the Text
+# Analysis page together. Clouds are rendered from the aggregates' word
+# counts with generate_from_frequencies and saved as PNGs under the cache
+# directory, one directory per dataset version, named after what the cloud
+# shows: sentiment (and the thresholds labelling it), colormap and size. Pages
+# serve the file as an image; server restarts and other sessions reuse it.
+#
+# Every threshold pair the slider can pick names its own sentiment clouds, so
+# each version's directory keeps only the CLOUD_FILES most recently shown
+# (by modification time, refreshed whenever a cloud is served).
+import glob
+import os
+
+from wordcloud import STOPWORDS, WordCloud
+
+from core.config import CACHE_DIR
+from core.dataset import prune, temp_path
+
+WIDTH = 900
+HEIGHT = 400
+CLOUD_FILES = 60
+
+
+def cloud_frequencies(word_freq):
+    # Word counts come pre-aggregated, so the cloud skips WordCloud's own
+    # tokenizing and only drops its stopwords
+    return word_freq[~word_freq.index.isin(STOPWORDS)].to_dict()
+
+
+def cloud_dir(version, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"wordclouds-{version}")
+
+
+def cloud_path(version, colormap, negative=None, positive=None, sentiment=None, width=WIDTH, height=HEIGHT,
+               cache_dir=CACHE_DIR):
+    label = 'all' if sentiment is None else f"{sentiment}_{negative:+.2f}_{positive:+.2f}"
+    return os.path.join(cloud_dir(version, cache_dir), f"{label}-{colormap}-{width}x{height}.png")
+
+
+def word_cloud(aggregates, version, colormap, negative=None, positive=None, sentiment=None,
+               width=WIDTH, height=HEIGHT, cache_dir=CACHE_DIR):
+    """Path of the PNG cloud of aggregates' words (only in rows labelled ``sentiment`` if given).
+
+    Rendered on first use for each dataset version; None if there are no
+    words to show.
+    """
+    path = cloud_path(version, colormap, negative, positive, sentiment, width, height, cache_dir)
+    try:
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+    frequencies = cloud_frequencies(aggregates.word_counts(negative, positive, sentiment))
+    if not frequencies:
+        return None
+    image = WordCloud(width=width, height=height,
+                      background_color='white',
+                      colormap=colormap,
+                      relative_scaling=0.5).generate_from_frequencies(frequencies).to_image()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = temp_path(path)
+    image.save(tmp, format='PNG')
+    os.replace(tmp, path)
+    # Directories of versions no longer served are deleted by core.watcher
+    prune(os.path.dirname(path), cache_dir)
+    trim(os.path.dirname(path))
+    return path
+
+
+def trim(directory, keep=CLOUD_FILES):
+    """Delete all but the ``keep`` most recently used clouds in ``directory``."""
+    clouds = []
+    for path in glob.glob(os.path.join(directory, '*.png')):
+        try:
+            clouds.append((os.stat(path).st_mtime_ns, path))
+        except FileNotFoundError:
+            pass
+    for _, path in sorted(clouds, reverse=True)[keep:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,16 @@
+# core/config.py - Paths and per-deployment settings, overridable from the environment
+import os
+
+DATA_PATH = os.environ.get('TWITTER_DATA_PATH', "./Data/twitter_dataset.csv")
+CACHE_DIR = os.environ.get('TWITTER_CACHE_DIR', "./Data/.cache")
+
+# Scoring backend used by the dashboard: textblob, lexicon or linear
+SENTIMENT_BACKEND = os.environ.get('SENTIMENT_BACKEND', 'textblob')
+
+# Trained by python -m core.distill and served by the linear backend
+DISTILLED_MODEL_PATH = os.environ.get('DISTILLED_MODEL_PATH',
+                                      os.path.join(CACHE_DIR, "distilled_sentiment.joblib"))
+
+# Seconds between checks of the CSV for changes by the background watcher;
+# 0 checks it on every page load instead
+WATCH_INTERVAL = float(os.environ.get('TWITTER_WATCH_INTERVAL', 5))
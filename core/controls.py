@@ -0,0 +1,61 @@
+# core/controls.py - Sidebar controls and loaders shared by the dashboard pages
+import streamlit as st
+
+from core.dataset import date_bounds
+from core.sentiment import NEGATIVE_THRESHOLD, POSITIVE_THRESHOLD
+from core.watcher import current_version, dataset_copy, load_version
+
+
+def sentiment_thresholds():
+    """Sidebar slider for the polarity band labelled Neutral; returns (negative, positive).
+
+    The choice is kept in session state so it follows the user across pages.
+    """
+    # Streamlit drops a widget's state on pages that don't render it;
+    # re-assigning the key carries the value over to this page
+    st.session_state['sentiment_thresholds'] = st.session_state.get(
+        'sentiment_thresholds', (NEGATIVE_THRESHOLD, POSITIVE_THRESHOLD))
+    with st.sidebar:
+        negative, positive = st.slider(
+            "Neutral polarity band",
+            min_value=-1.0, max_value=1.0, step=0.01,
+            key='sentiment_thresholds',
+            help="Tweets with polarity above the band are Positive, below it Negative."
+        )
+    return negative, positive
+
+
+@st.cache_resource(max_entries=4)
+def load_served(kind, version):
+    """The ``kind`` ('aggregates' or 'phrases') of ``version``, as returned by current_version().
+
+    Exactly that version's (core.watcher builds it for a new version before
+    serving it): one copy per process, shared by every session and only read.
+    """
+    return load_version(kind, version)
+
+
+@st.cache_data
+def _dataset_bounds(version):
+    return date_bounds(copy=dataset_copy(version))
+
+
+def date_range():
+    """Sidebar date range within the dataset's span; returns (start, end) dates, both inclusive.
+
+    Like the thresholds, the choice follows the user across pages. Pages pass
+    it to their loaders so only the months in range are read.
+    """
+    first, last = (bound.date() for bound in _dataset_bounds(current_version()))
+    start, end = (tuple(st.session_state.get('date_range', ())) + (first, last))[:2]
+    # Keep a range chosen before the dataset changed within the new span
+    st.session_state['date_range'] = (min(max(start, first), last), min(max(end, first), last))
+    with st.sidebar:
+        selected = st.date_input(
+            "Date range",
+            min_value=first, max_value=last,
+            key='date_range',
+            help="Pages that support it only read and show tweets posted in this range."
+        )
+    # While a new range is being picked, only its start date is set
+    return (selected[0], selected[1]) if len(selected) == 2 else (selected[0], last)
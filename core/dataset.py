@@ -0,0 +1,461 @@
+# core/dataset.py - Columnar copy of the source CSV
+#
+# Parsing the CSV (multi-line quoted tweets, timestamp strings) dominated every
+# cold load. ingest converts it once into uncompressed Arrow IPC (Feather)
+# files with the compact dtypes from core.schema, in a directory named after a
+# hash of the CSV. The files are partitioned by month, Hive-style:
+#
+#   dataset-<hash>.v5/manifest.json
+#   dataset-<hash>.v5/Month=2023-01/part-000000000000-<hash>.arrow
+#   dataset-<hash>.v5/Month=2023-02/part-000000000000-<hash>.arrow
+#   dataset-<hash>.v5/Month=2023-02/part-000005427686-<hash>.arrow
+#
+# Each part holds the rows parsed from one byte range of the CSV, named after
+# its start offset and the hash of the CSV up to its end. The manifest records
+# how many bytes of the CSV have been converted and their hash: when rows are
+# appended to the CSV, only the new bytes are parsed, into a new part; any
+# other edit rebuilds the copy.
+#
+# Loads memory-map the files and read only the columns they ask for, whole or
+# one record batch at a time; given a date range they skip the partitions
+# outside it.
+import glob
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from core.config import CACHE_DIR, DATA_PATH
+from core.schema import TEXT_DTYPE, apply_schema, frame_memory, log_memory
+
+DATE_COLUMNS = ['Timestamp']
+# Bumped whenever the conversion changes, so older copies are rebuilt
+DATASET_VERSION = 5
+PARTITION_KEY = 'Month'
+# Partition of rows without a timestamp (Hive's name for a null key)
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+MANIFEST = 'manifest.json'
+# Rows parsed, converted and written per record batch
+CHUNK_ROWS = 100_000
+
+logger = logging.getLogger(__name__)
+
+
+def hash_source(path, offsets=()):
+    """Return (size, sha256) of the file, and a {offset: sha256} of its first ``offsets`` bytes.
+
+    One pass over the file, so checking whether it only grew since an
+    earlier hash costs no more than hashing it.
+    """
+    digest = hashlib.sha256()
+    prefixes = {}
+    size = 0
+    pending = sorted(set(offsets))
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            while pending and pending[0] <= size + len(block):
+                cut = pending.pop(0) - size
+                digest.update(block[:cut])
+                block, size = block[cut:], size + cut
+                prefixes[size] = digest.hexdigest()
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest(), prefixes
+
+
+def source_stat(path):
+    """The CSV's path, size and modification time, as recorded in the manifest."""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'inode': stat.st_ino}
+
+
+def file_hash(path):
+    return hash_source(path)[1]
+
+
+def dataset_path(source_hash, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"dataset-{source_hash[:16]}.v{DATASET_VERSION}")
+
+
+class _ByteRange(io.RawIOBase):
+    """Bytes [start, stop) of an open file, so part of the CSV parses without being copied."""
+
+    def __init__(self, f, start, stop):
+        f.seek(start)
+        self.f = f
+        self.remaining = stop - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self.f.readinto(memoryview(buffer)[:min(len(buffer), self.remaining)])
+        self.remaining -= n
+        return n
+
+
+def _parse_source(f, header, start, stop, chunksize):
+    parse_dates = [column for column in DATE_COLUMNS if column in header]
+    rows = f if not start and stop is None else io.BufferedReader(_ByteRange(f, start, stop))
+    if start:
+        # Appended rows come without the header line
+        return pd.read_csv(rows, names=header, header=None, parse_dates=parse_dates, chunksize=chunksize)
+    return pd.read_csv(rows, parse_dates=parse_dates, chunksize=chunksize)
+
+
+def _iter_source(path, header, start, stop, chunksize):
+    with open(path, 'rb') as f:
+        yield from _parse_source(f, header, start, stop, chunksize)
+
+
+def read_source(path=DATA_PATH, chunksize=None, start=0, stop=None):
+    """Parse the CSV itself, with its timestamp columns as datetimes.
+
+    With ``chunksize``, returns an iterator of frames of that many rows. With
+    ``start``/``stop``, parses only those bytes of the file: the header, or
+    whole rows after it.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    if chunksize is not None:
+        return _iter_source(path, header, start, stop, chunksize)
+    with open(path, 'rb') as f:
+        return _parse_source(f, header, start, stop, None)
+
+
+def _storage_frame(df):
+    # An Arrow IPC file can't change a dictionary between record batches, so
+    # categorical columns are stored as strings and re-categorized on read
+    categorical = [column for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)]
+    return df.astype({column: TEXT_DTYPE for column in categorical}).reset_index(drop=True)
+
+
+def month_partitions(timestamps):
+    """Hive-style partition name (Month=YYYY-MM) of each timestamp."""
+    months = timestamps.dt.strftime('%Y-%m').fillna(NULL_PARTITION)
+    return f"{PARTITION_KEY}=" + months
+
+
+def _partition_month(partition):
+    return partition.split('=', 1)[1]
+
+
+def temp_path(path):
+    """Temporary file to write ``path`` to before renaming it into place.
+
+    Streamlit sessions are threads of one process, and the dataset watcher
+    is another: each writer gets its own file, and the rename is atomic.
+    """
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def part_name(offset, source_hash):
+    """File name of the part holding the CSV rows from byte ``offset`` to where the CSV hashed to ``source_hash``."""
+    return f"part-{offset:012d}-{source_hash[:16]}.arrow"
+
+
+class _BatchWriter:
+    """Appends frames with the same columns to an Arrow IPC file, a record batch per frame."""
+
+    def __init__(self, path):
+        self.path = path
+        # Several sessions may write the same file at once
+        self.tmp = temp_path(path)
+        self.writer = self.schema = None
+
+    def write(self, frame):
+        # Later batches are cast to the first one's schema
+        table = pa.Table.from_pandas(_storage_frame(frame), preserve_index=False, schema=self.schema)
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.schema = table.schema
+            self.writer = pa.ipc.new_file(self.tmp, self.schema)
+        self.writer.write_table(table)
+
+    def close(self, commit=True):
+        if self.writer is None:
+            return
+        self.writer.close()
+        if commit:
+            os.replace(self.tmp, self.path)
+        else:
+            os.remove(self.tmp)
+
+
+def write_parts(parts, directory):
+    """Write (partition, part, frame) triples to ``directory/<partition>/<part>``, a record batch per triple.
+
+    Returns the number of frames written. Uncompressed, so readers can
+    memory-map the files without decoding.
+    """
+    writers = {}
+    written = 0
+    try:
+        for partition, part, frame in parts:
+            key = os.path.join(partition, part)
+            if key not in writers:
+                writers[key] = _BatchWriter(os.path.join(directory, key))
+            writers[key].write(frame)
+            written += 1
+    except BaseException:
+        for writer in writers.values():
+            writer.close(commit=False)
+        raise
+    for writer in writers.values():
+        writer.close()
+    return written
+
+
+def read_manifest(directory):
+    """The manifest of a copy written by ingest, or None if it isn't complete."""
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(directory, manifest):
+    # Written last and renamed into place: readers only see the parts it lists
+    path = os.path.join(directory, MANIFEST)
+    tmp = temp_path(path)
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _remove(path):
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def _cache_key(name):
+    # (backend id or None, dataset id or version hash) a cache entry is named
+    # after: dataset-<id>.v5, features-<backend>-<id>.v7,
+    # wordclouds-<backend>-<hash>.v5; None for entries that aren't per version
+    # (scores.sqlite)
+    match = re.match(r'[a-z]+-(?:(.+)-)?([0-9a-f]{16})\.', name)
+    return match.groups() if match else None
+
+
+def prune(keep, cache_dir=CACHE_DIR):
+    # Drop older formats of the same cache (same prefix and dataset id, another
+    # .vN suffix). Other dataset versions may still be served: the watcher
+    # drops those (prune_versions)
+    name = os.path.basename(keep)
+    prefix, key = name.rsplit('-', 1)[0], _cache_key(name)[1]
+    for stale in glob.glob(os.path.join(cache_dir, f"{prefix}-{key}.*")):
+        if not stale.endswith('.tmp') and os.path.abspath(stale) != os.path.abspath(keep):
+            _remove(stale)
+
+
+def prune_versions(served, cache_dir=CACHE_DIR):
+    """Delete every per-version cache but those of ``served``, the (backend id, manifest) of the versions
+    still served."""
+    keep = set()
+    for backend, manifest in served:
+        keep |= {(None, manifest['id']), (backend, manifest['id']), (backend, manifest['source_sha256'][:16])}
+    for stale in glob.glob(os.path.join(cache_dir, '*')):
+        key = _cache_key(os.path.basename(stale))
+        if key is not None and key not in keep and not stale.endswith('.tmp'):
+            _remove(stale)
+
+
+def partitions(directory, start=None, end=None):
+    """Partition names under ``directory`` in month order, only those overlapping [start, end] if given.
+
+    ``start`` and ``end`` are dates (inclusive); rows without a timestamp
+    only belong to unbounded reads.
+    """
+    names = sorted(name for name in os.listdir(directory) if name.startswith(f"{PARTITION_KEY}="))
+    if start is None and end is None:
+        return names
+    first = pd.Timestamp(start).strftime('%Y-%m') if start is not None else ''
+    last = pd.Timestamp(end).strftime('%Y-%m') if end is not None else '9999-12'
+    return [name for name in names
+            if _partition_month(name) != NULL_PARTITION and first <= _partition_month(name) <= last]
+
+
+def part_files(directory, parts, start=None, end=None):
+    """(partition, part) of each file holding ``parts``, in the order rows are read.
+
+    Rows are read month by month, and within a month in the order they were
+    appended to the CSV, so the dataset and its feature stores list the same
+    files for the same ``parts``.
+    """
+    files = []
+    for partition in partitions(directory, start, end):
+        present = set(os.listdir(os.path.join(directory, partition)))
+        files.extend((partition, part) for part in parts if part in present)
+    return files
+
+
+def in_range(timestamps, start=None, end=None):
+    """Boolean mask of timestamps between the dates ``start`` and ``end`` (inclusive)."""
+    mask = timestamps.notna()
+    if start is not None:
+        mask &= timestamps >= pd.Timestamp(start)
+    if end is not None:
+        mask &= timestamps < pd.Timestamp(end) + pd.Timedelta(days=1)
+    return mask
+
+
+def read_columns(directory, parts, columns=None, start=None, end=None):
+    """Memory-map the files of ``parts`` and read only ``columns``.
+
+    With ``start``/``end``, only the partitions overlapping that range are
+    read; rows are not filtered within them.
+    """
+    files = part_files(directory, parts, start, end)
+    # With no file in range, an empty read of any of them keeps the columns and dtypes
+    tables = [feather.read_table(os.path.join(directory, *file), columns=columns, memory_map=True)
+              for file in files or part_files(directory, parts)[:1]]
+    table = pa.concat_tables(tables) if files else tables[0].slice(0, 0)
+    return apply_schema(table.to_pandas())
+
+
+def iter_parts(directory, parts, columns=None, start=None, end=None):
+    """Yield (partition, part, frame) for each record batch of the files read_columns would read."""
+    for partition, part in part_files(directory, parts, start, end):
+        with pa.memory_map(os.path.join(directory, partition, part)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                yield partition, part, apply_schema(batch.to_pandas())
+
+
+def iter_batches(directory, parts, columns=None, start=None, end=None):
+    """Like iter_parts, without the file names."""
+    for _, _, frame in iter_parts(directory, parts, columns, start, end):
+        yield frame
+
+
+def _compact_chunks(path, start, stop, part):
+    before = after = 0
+    for chunk in read_source(path, CHUNK_ROWS, start, stop):
+        compact = apply_schema(chunk)
+        before += frame_memory(chunk)
+        after += frame_memory(compact)
+        for partition, rows in compact.groupby(month_partitions(compact['Timestamp']), sort=False):
+            yield partition, part, rows
+    log_memory(before, after, "Dataset")
+
+
+def _find_copy(path, cache_dir, stat):
+    # The copy the CSV is the same as, or has only had rows appended to, and the CSV's size and hash
+    copies = {}
+    for directory in glob.glob(os.path.join(cache_dir, f"dataset-*.v{DATASET_VERSION}")):
+        manifest = read_manifest(directory)
+        if manifest is None:
+            continue
+        if manifest.get('source_stat') == stat:
+            # Unchanged since the copy was last checked: no need to hash it
+            return directory, manifest, manifest['source_bytes'], manifest['source_sha256']
+        copies[directory] = manifest
+    size, source_hash, prefixes = hash_source(path, [manifest['source_bytes'] for manifest in copies.values()])
+    for directory, manifest in copies.items():
+        if prefixes.get(manifest['source_bytes']) == manifest['source_sha256']:
+            return directory, manifest, size, source_hash
+    return None, None, size, source_hash
+
+
+def ingest(path=DATA_PATH, cache_dir=CACHE_DIR):
+    """Bring the CSV's columnar copy up to date; return (directory, manifest).
+
+    If the CSV only had rows appended since the copy was made, just those
+    rows are converted, into a new part; otherwise the copy is rebuilt. The
+    CSV is converted CHUNK_ROWS rows at a time, so it never has to fit in
+    memory.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    stat = source_stat(path)
+    directory, manifest, size, source_hash = _find_copy(path, cache_dir, stat)
+    if manifest is not None and manifest['source_sha256'] == source_hash:
+        if manifest.get('source_stat') != stat:
+            # Touched or copied over with the same contents
+            manifest = dict(manifest, source_stat=stat)
+            write_manifest(directory, manifest)
+        return directory, manifest
+
+    if manifest is None:
+        # The copy keeps the id of the CSV it was built from as rows are appended
+        copy_id, start, parts = source_hash[:16], 0, []
+        directory = dataset_path(copy_id, cache_dir)
+    else:
+        copy_id, start, parts = manifest['id'], manifest['source_bytes'], manifest['parts']
+        logger.info("Converting %d bytes appended to %s", size - start, path)
+    part = part_name(start, source_hash)
+    if write_parts(_compact_chunks(path, start, size, part), directory):
+        parts = parts + [part]
+    elif not parts:
+        raise ValueError(f"No rows in {path}")
+    manifest = {'id': copy_id, 'source_bytes': size, 'source_sha256': source_hash, 'source_stat': stat,
+                'parts': parts}
+    write_manifest(directory, manifest)
+    prune(directory, cache_dir)
+    return directory, manifest
+
+
+def version_id(manifest):
+    """Identifier of the dataset version a manifest describes: the CSV's hash and DATASET_VERSION."""
+    return f"{manifest['source_sha256'][:16]}.v{DATASET_VERSION}"
+
+
+def dataset_version(path=DATA_PATH, cache_dir=CACHE_DIR):
+    """The current dataset version, bringing the columnar copy up to date first.
+
+    Every cache above the columnar copy keys on it, so each one is invalidated
+    exactly when the CSV changes, and stays valid across restarts until then.
+    """
+    return version_id(ingest(path, cache_dir)[1])
+
+
+def date_bounds(path=DATA_PATH, cache_dir=CACHE_DIR, copy=None):
+    """First and last Timestamp in the dataset, read from its first and last month only.
+
+    ``copy`` is the (directory, manifest) of the version to read, if not the
+    CSV as it is now.
+    """
+    directory, manifest = copy or ingest(path, cache_dir)
+    months = [_partition_month(name) for name in partitions(directory)
+              if _partition_month(name) != NULL_PARTITION]
+    if not months:
+        return pd.NaT, pd.NaT
+    first, last = (read_columns(directory, manifest['parts'], ['Timestamp'], month, month)['Timestamp']
+                   for month in (months[0], months[-1]))
+    return first.min(), last.max()
+
+
+def with_timestamp(columns, start=None, end=None):
+    """``columns`` plus Timestamp when a date range has to be applied to them."""
+    if (start is None and end is None) or columns is None or 'Timestamp' in columns:
+        return columns
+    return list(columns) + ['Timestamp']
+
+
+def load_dataset(columns=None, path=DATA_PATH, cache_dir=CACHE_DIR, start=None, end=None):
+    """Return the CSV's rows (only ``columns`` if given) from the columnar copy.
+
+    With ``start``/``end`` (dates, inclusive), only rows in that range, read
+    from the month partitions that overlap it.
+    """
+    directory, manifest = ingest(path, cache_dir)
+    df = read_columns(directory, manifest['parts'], with_timestamp(columns, start, end), start, end)
+    if start is not None or end is not None:
+        df = df[in_range(df['Timestamp'], start, end)].reset_index(drop=True)
+    return df if columns is None else df[columns]
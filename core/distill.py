@@ -0,0 +1,153 @@
+# core/distill.py - Distils TextBlob into a hashed-feature linear model
+#
+# Usage: python -m core.distill [--data path/to/dataset.csv] [--out model.joblib]
+#
+# TextBlob labels the training tweets; a HashingVectorizer feeds a ridge
+# regressor (Polarity, Subjectivity) and a logistic-regression classifier
+# (Sentiment). Prediction is one sparse matrix product per batch, so it scales
+# to backfills far beyond what per-row TextBlob can score. The saved model is
+# served by the "linear" backend.
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression, Ridge
+
+from core.config import DATA_PATH, DISTILLED_MODEL_PATH
+from core.score_cache import ScoreCache
+from core.sentiment import label_sentiment, score_texts
+
+
+class DistilledModel:
+    def __init__(self, n_features=2 ** 20):
+        self.vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False)
+        self.regressor = Ridge(alpha=1.0)
+        self.classifier = LogisticRegression(C=100, max_iter=3000)
+        # 'classifier' or 'regressor': which head the Sentiment labels come from
+        self.label_source = 'classifier'
+
+    def fit(self, texts, scores):
+        features = self.vectorizer.transform(pd.Series(texts).astype(str))
+        self.regressor.fit(features, scores[['Polarity', 'Subjectivity']].to_numpy())
+        self.classifier.fit(features, scores['Sentiment'].to_numpy())
+        self._compile()
+        return self
+
+    def _compile(self):
+        # Ridge.predict copies its (2, n_features) coefficients into column
+        # order on every call, which dominates single-text latency; keep a
+        # contiguous (n_features, 2) copy and do the product directly
+        self.weights = np.ascontiguousarray(self.regressor.coef_.T)
+        self.intercept = self.regressor.intercept_
+
+    def predict(self, texts, label_source=None):
+        texts = pd.Series(texts)
+        features = self.vectorizer.transform(texts.astype(str))
+        predicted = np.asarray(features @ self.weights) + self.intercept
+        polarity = np.clip(predicted[:, 0], -1.0, 1.0)
+        if (label_source or self.label_source) == 'classifier':
+            sentiment = self.classifier.predict(features)
+        else:
+            sentiment = label_sentiment(polarity)
+        return pd.DataFrame({
+            'Polarity': polarity,
+            'Subjectivity': np.clip(predicted[:, 1], 0.0, 1.0),
+            'Sentiment': sentiment,
+        }, index=texts.index)
+
+
+def teacher_scores(texts):
+    # TextBlob is always the teacher, whatever backend the dashboard runs
+    return ScoreCache(namespace='textblob', scorer=score_texts).score_texts(texts)
+
+
+def train_model(texts, test_size=0.2, seed=0):
+    """Fit on TextBlob labels and return (model, report) for the held-out split."""
+    texts = pd.Series(pd.unique(pd.Series(texts).astype(str)))
+    scores = teacher_scores(texts)
+    order = np.random.RandomState(seed).permutation(len(texts))
+    n_test = int(len(texts) * test_size)
+    test, train = order[:n_test], order[n_test:]
+
+    model = DistilledModel().fit(texts.iloc[train], scores.iloc[train])
+    expected = scores.iloc[test]
+    start = time.perf_counter()
+    by_classifier = model.predict(texts.iloc[test], label_source='classifier')
+    predict_s = time.perf_counter() - start
+    by_regressor = label_sentiment(by_classifier['Polarity'])
+
+    sample = texts.iloc[test[:500]]
+    start = time.perf_counter()
+    score_texts(sample, workers=1)
+    textblob_s = time.perf_counter() - start
+
+    report = {
+        'train_texts': len(train),
+        'test_texts': n_test,
+        'classifier_accuracy': (by_classifier['Sentiment'] == expected['Sentiment']).mean(),
+        'regressor_accuracy': (by_regressor == expected['Sentiment'].to_numpy()).mean(),
+        'polarity_mae': (by_classifier['Polarity'] - expected['Polarity']).abs().mean(),
+        'subjectivity_mae': (by_classifier['Subjectivity'] - expected['Subjectivity']).abs().mean(),
+        'model_rows_per_s': n_test / predict_s,
+        'textblob_rows_per_s': len(sample) / textblob_s,
+    }
+    model.label_source = 'classifier' \
+        if report['classifier_accuracy'] >= report['regressor_accuracy'] else 'regressor'
+    report['label_source'] = model.label_source
+    # Final model sees every labelled text
+    model.fit(texts, scores)
+    return model, report
+
+
+def save_model(model, path=DISTILLED_MODEL_PATH):
+    # Only scikit-learn objects are pickled, so the file does not depend on
+    # the module DistilledModel was defined in when it was trained
+    state = {
+        'n_features': model.vectorizer.n_features,
+        'regressor': model.regressor,
+        'classifier': model.classifier,
+        'label_source': model.label_source,
+    }
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(state, tmp)
+    os.replace(tmp, path)
+
+
+def load_model(path=DISTILLED_MODEL_PATH):
+    state = joblib.load(path)
+    model = DistilledModel(n_features=state['n_features'])
+    model.regressor = state['regressor']
+    model.classifier = state['classifier']
+    model.label_source = state['label_source']
+    model._compile()
+    return model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.distill",
+                                     description="Train the distilled sentiment model from TextBlob labels.")
+    parser.add_argument('--data', default=DATA_PATH, help="CSV with a Text column")
+    parser.add_argument('--out', default=DISTILLED_MODEL_PATH, help="where to save the model")
+    parser.add_argument('--test-size', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    texts = pd.read_csv(args.data, usecols=['Text'])['Text']
+    model, report = train_model(texts, test_size=args.test_size)
+    save_model(model, args.out)
+    print(f"Trained on {report['train_texts']:,} texts, evaluated on {report['test_texts']:,} held-out texts")
+    print(f"  label accuracy vs TextBlob: classifier {report['classifier_accuracy']:.2%}, "
+          f"thresholded regressor {report['regressor_accuracy']:.2%} (serving: {report['label_source']})")
+    print(f"  mean abs error: polarity {report['polarity_mae']:.4f}, subjectivity {report['subjectivity_mae']:.4f}")
+    print(f"  throughput: model {report['model_rows_per_s']:,.0f} rows/s, "
+          f"TextBlob {report['textblob_rows_per_s']:,.0f} rows/s")
+    print(f"Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# core/feature_store.py - Scores the dataset once and persists the features
+#
+# Every page used to re-read the CSV and re-run TextBlob over every tweet. The
+# store writes the per-row features to columnar files next to the dataset's
+# own copy (core.dataset), one file per dataset part, so any later load (other
+# pages, server restarts) is a memory-mapped read, and rows appended to the
+# CSV only cost scoring the new part. Only raw scores are stored; pages derive
+# the Sentiment label at view time with sentiment.with_sentiment.
+import logging
+import os
+
+import pandas as pd
+
+from core.backends import backend_id
+from core.config import CACHE_DIR, DATA_PATH
+from core.dataset import (in_range, ingest, iter_batches, iter_parts, prune, read_columns, read_manifest,
+                          with_timestamp, write_manifest, write_parts)
+from core.schema import apply_schema
+from core.score_cache import get_cache
+from core.text import clean_texts
+
+FEATURE_COLUMNS = ['Polarity', 'Subjectivity', 'Cleaned_Text', 'Text_Length']
+# Bumped whenever FEATURE_COLUMNS or the file layout change, so older stores are rebuilt
+STORE_VERSION = 7
+
+logger = logging.getLogger(__name__)
+
+
+def feature_path(dataset_id, cache_dir=CACHE_DIR, backend=None):
+    backend = backend or backend_id()
+    return os.path.join(cache_dir, f"features-{backend}-{dataset_id}.v{STORE_VERSION}")
+
+
+def dedup_index(texts):
+    """Return (codes, distinct) with distinct[codes] == texts; missing texts count as one value."""
+    codes, distinct = pd.factorize(pd.Series(texts), use_na_sentinel=False)
+    return codes, pd.Series(distinct)
+
+
+def build_features(texts):
+    """Return FEATURE_COLUMNS for each text, indexed like ``texts``."""
+    # Retweets and copy-pasted tweets repeat the same text: score and clean
+    # each distinct text once, then broadcast back to the rows
+    texts = pd.Series(texts)
+    codes, distinct = dedup_index(texts)
+    if len(texts):
+        logger.info("Scoring %d distinct texts for %d rows (dedup ratio %.3f)",
+                    len(distinct), len(texts), 1 - len(distinct) / len(texts))
+    features = get_cache().score_texts(distinct)
+    features['Cleaned_Text'], features['Text_Length'] = clean_texts(distinct)
+    return apply_schema(features.iloc[codes].set_axis(texts.index)[FEATURE_COLUMNS])
+
+
+def build_store(dataset, manifest, cache_dir=CACHE_DIR):
+    """Score the dataset parts its feature store doesn't have yet; return the store's directory.
+
+    Features are built one dataset record batch at a time, so the store's
+    files and batches line up with the dataset's.
+    """
+    store = feature_path(manifest['id'], cache_dir)
+    scored = (read_manifest(store) or {'parts': []})['parts']
+    missing = [part for part in manifest['parts'] if part not in scored]
+    if missing:
+        write_parts(((partition, part, build_features(batch['Text']))
+                     for partition, part, batch in iter_parts(dataset, missing, ['Text'])), store)
+        write_manifest(store, {'parts': scored + missing})
+        prune(store, cache_dir)
+    return store
+
+
+def _split(columns):
+    if columns is None:
+        return None, FEATURE_COLUMNS
+    return ([column for column in columns if column not in FEATURE_COLUMNS],
+            [column for column in columns if column in FEATURE_COLUMNS])
+
+
+def _select(frames, columns, start, end):
+    df = pd.concat(frames, axis=1) if len(frames) > 1 else frames[0]
+    if start is not None or end is not None:
+        df = df[in_range(df['Timestamp'], start, end)]
+    return df if columns is None else df[columns]
+
+
+def load_features(columns=None, path=DATA_PATH, cache_dir=CACHE_DIR, start=None, end=None, copy=None):
+    """Return the dataset with FEATURE_COLUMNS, scoring it only if the CSV changed.
+
+    With ``columns``, only those are read, and the dataset is only scored if
+    one of them is a feature column. With ``start``/``end`` (dates,
+    inclusive), only rows in that range, read from the month partitions that
+    overlap it. ``copy`` is the (directory, manifest) of the version to read,
+    if not the CSV as it is now.
+    """
+    dataset, manifest = copy or ingest(path, cache_dir)
+    raw, features = _split(columns)
+    raw = with_timestamp(raw, start, end)
+    frames = []
+    if raw is None or raw:
+        frames.append(read_columns(dataset, manifest['parts'], raw, start, end))
+    if features:
+        frames.append(read_columns(build_store(dataset, manifest, cache_dir), manifest['parts'], features,
+                                   start, end))
+    return _select(frames, columns, start, end).reset_index(drop=True)
+
+
+def iter_features(columns=None, path=DATA_PATH, cache_dir=CACHE_DIR, start=None, end=None, parts=None,
+                  copy=None):
+    """Like load_features, but yields the rows one record batch at a time.
+
+    With ``parts``, only the rows of those dataset parts (see core.dataset).
+    ``copy`` is the (directory, manifest) ingest just returned, if the caller
+    has it, to skip checking the CSV again.
+    """
+    dataset, manifest = copy or ingest(path, cache_dir)
+    parts = manifest['parts'] if parts is None else parts
+    raw, features = _split(columns)
+    raw = with_timestamp(raw, start, end)
+    sources = []
+    if raw is None or raw:
+        sources.append(iter_batches(dataset, parts, raw, start, end))
+    if features:
+        sources.append(iter_batches(build_store(dataset, manifest, cache_dir), parts, features, start, end))
+    for frames in zip(*sources):
+        yield _select(frames, columns, start, end)
@@ -0,0 +1,180 @@
+# core/lexicon.py - Vectorized scoring with TextBlob's pattern lexicon
+#
+# TextBlob walks each text word by word in Python. LexiconScorer compiles the
+# same lexicon (polarity, subjectivity, intensity, adverb modifiers and
+# negations) into arrays, tokenizes the whole corpus into one flat token array
+# and resolves the pattern rules with array operations:
+#
+#   - a known word scores its lexicon polarity/subjectivity
+#   - a known adverb before a known word ("very good") multiplies the word's
+#     scores by the adverb's intensity and the pair counts once
+#   - a negation before it ("not good", "not a good") flips polarity by -0.5
+#   - each "!" after it boosts polarity by 1.25
+#   - a text scores the mean over its assessments
+#
+# Emoticons, "(!)" irony marks and pattern's tokenizer corner cases (split
+# contractions, abbreviations) are not reproduced. On Data/twitter_dataset.csv
+# this agrees with TextBlob(text).sentiment to within TOLERANCE on every row
+# and on every Positive/Neutral/Negative label, which tests/test_lexicon.py
+# asserts; python -m core.benchmark reports the measured figures.
+import re
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from textblob.en import sentiment as pattern_sentiment
+
+from core.sentiment import label_sentiment
+
+TOKEN_RE = re.compile(r"\w+(?:[-*]\w+)*|\.\.\.|[^\w\s]")
+# Private-use code point joining texts for the corpus-wide split
+DOC_SEPARATOR = "\ue000"
+NEGATIONS = ("no", "not", "n't", "never")
+MODIFIER_TAG = "RB"
+EXCLAMATION_BOOST = 1.25
+NEGATION_FACTOR = -0.5
+# Max absolute polarity/subjectivity difference from TextBlob on our dataset
+TOLERANCE = 1e-9
+
+
+def _ffill_state(events, starts):
+    # State before each token: the last event in the same text, -1 at text start
+    state = np.empty_like(events)
+    state[0:1] = -1
+    state[1:] = events[:-1]
+    state[starts] = -1
+    defined = ~np.isnan(state)
+    last = np.maximum.accumulate(np.where(defined, np.arange(len(state)), 0))
+    return state[last]
+
+
+class LexiconScorer:
+    def __init__(self, lexicon=None):
+        lexicon = pattern_sentiment if lexicon is None else lexicon
+        if dict.__len__(lexicon) == 0:
+            lexicon.load()
+        words = list(lexicon.keys())
+        self.index = {word: i for i, word in enumerate(words)}
+        scores = np.array([lexicon[word][None] for word in words], dtype=float)
+        self.polarity = scores[:, 0]
+        self.subjectivity = scores[:, 1]
+        self.intensity = scores[:, 2]
+        self.is_modifier = np.array([MODIFIER_TAG in lexicon[word] for word in words])
+
+    def _tokenize(self, texts):
+        # One split over the joined corpus, then the token regex runs once per
+        # distinct whitespace chunk and the pieces are gathered back in order
+        texts = [str(text).replace(DOC_SEPARATOR, "") for text in texts]
+        chunks = np.array(f" {DOC_SEPARATOR} ".join(texts).lower().split(), dtype=object)
+        chunk_codes, distinct = pd.factorize(chunks)
+        separator = chunks == DOC_SEPARATOR
+        chunk_doc = np.cumsum(separator)[~separator]
+        chunk_codes = chunk_codes[~separator]
+
+        pieces = [TOKEN_RE.findall(chunk) for chunk in distinct]
+        n_pieces = np.array([len(piece) for piece in pieces], dtype=int)
+        piece_codes, vocab = pd.factorize(np.fromiter(chain.from_iterable(pieces), dtype=object,
+                                                      count=n_pieces.sum()))
+        per_chunk = n_pieces[chunk_codes]
+        offsets = np.cumsum(n_pieces) - n_pieces
+        gather = np.repeat(offsets[chunk_codes] - (np.cumsum(per_chunk) - per_chunk), per_chunk)
+        codes = piece_codes[gather + np.arange(len(gather))]
+        lengths = np.bincount(chunk_doc, weights=per_chunk, minlength=len(texts)).astype(int)
+        return codes, np.asarray(vocab, dtype=object), lengths
+
+    def _assess(self, codes, vocab, lengths):
+        n_tokens = len(codes)
+        doc = np.repeat(np.arange(len(lengths)), lengths)
+        starts = np.zeros(n_tokens, dtype=bool)
+        starts[(np.cumsum(lengths) - lengths)[lengths > 0]] = True
+
+        vocab_ids = np.array([self.index.get(word, -1) for word in vocab], dtype=int)
+        vocab_neg = np.isin(vocab, NEGATIONS)
+        vocab_long = np.array([len(word) > 2 for word in vocab], dtype=bool)
+        vocab_breaks_neg = np.array([len(word.strip("'")) > 1 for word in vocab], dtype=bool)
+
+        ids = vocab_ids[codes]
+        known = ids >= 0
+        modifier = known & self.is_modifier[ids]
+        negation = vocab_neg[codes]
+        position = np.arange(n_tokens, dtype=float)
+
+        # Active modifier: set by a known adverb, cleared by any other known
+        # word or by an unknown word longer than two characters. A negation
+        # right after an "-ly" adverb ("really not good") attaches to the
+        # adverb instead, keeping it active; resolve that to a fixed point.
+        vocab_ly = np.array([word.endswith("ly") for word in vocab], dtype=bool)
+        m_events = np.full(n_tokens, np.nan)
+        m_events[known | vocab_long[codes]] = -1
+        m_events[modifier] = position[modifier]
+        neg_at = np.flatnonzero(negation & ~known)
+        attached = np.zeros(len(neg_at), dtype=bool)
+        while True:
+            m_before = _ffill_state(m_events, starts)
+            active = m_before[neg_at]
+            now = active >= 0
+            now[now] = vocab_ly[codes[active[now].astype(int)]]
+            if (now == attached).all():
+                break
+            attached = now
+            m_events[neg_at] = np.where(attached, np.nan, np.where(vocab_long[codes[neg_at]], -1, np.nan))
+
+        # Active negation: set by a negation, cleared by a known word or an
+        # unknown word longer than one character
+        n_events = np.full(n_tokens, np.nan)
+        n_events[known | vocab_breaks_neg[codes]] = -1
+        n_events[negation] = position[negation]
+        n_events[neg_at[attached]] = -1
+        n_before = _ffill_state(n_events, starts)
+
+        # Known words preceded by an active modifier extend the modifier's
+        # assessment instead of starting a new one
+        at = np.flatnonzero(known)
+        head = m_before[at] < 0
+        group = np.cumsum(head) - 1
+        n_groups = int(head.sum())
+        head_at = at[head]
+        last = np.flatnonzero(np.append(head[1:], True)[:len(head)])
+        last_at = at[last]
+
+        polarity = self.polarity[ids[last_at]]
+        subjectivity = self.subjectivity[ids[last_at]]
+        # A negated modifier divides instead ("not very good")
+        merged = ~head[last]
+        modifier_at = m_before[last_at][merged].astype(int)
+        boost = self.intensity[ids[modifier_at]]
+        boost = np.where(n_before[modifier_at] >= 0, 1.0 / boost, boost)
+        polarity[merged] = np.clip(polarity[merged] * boost, -1.0, 1.0)
+        subjectivity[merged] = np.clip(subjectivity[merged] * boost, -1.0, 1.0)
+
+        exclaim = np.flatnonzero(vocab[codes] == "!")
+        owner = np.searchsorted(head_at, exclaim, side='right') - 1
+        valid = owner >= 0
+        valid[valid] = (doc[head_at[owner[valid]]] == doc[exclaim[valid]]) \
+            & (exclaim[valid] > last_at[owner[valid]])
+        n_exclaim = np.bincount(owner[valid], minlength=n_groups)
+        polarity = np.clip(polarity * EXCLAMATION_BOOST ** n_exclaim, -1.0, 1.0)
+
+        negated = np.bincount(group, weights=n_before[at] >= 0, minlength=n_groups) > 0
+        attached_group = group[np.searchsorted(at, m_before[neg_at[attached]].astype(int))]
+        negated[attached_group] = True
+        polarity = np.where(negated, polarity * NEGATION_FACTOR, polarity)
+        return doc[head_at], polarity, subjectivity
+
+    def score(self, texts):
+        """Return Polarity, Subjectivity and Sentiment columns like score_texts."""
+        texts = pd.Series(texts)
+        n_docs = len(texts)
+        codes, vocab, lengths = self._tokenize(texts)
+        if len(codes):
+            group_doc, polarity, subjectivity = self._assess(codes, vocab, lengths)
+        else:
+            group_doc, polarity, subjectivity = (np.empty(0, dtype=int),) + (np.empty(0),) * 2
+        counts = np.maximum(np.bincount(group_doc, minlength=n_docs), 1)
+        polarity = np.bincount(group_doc, weights=polarity, minlength=n_docs) / counts
+        subjectivity = np.bincount(group_doc, weights=subjectivity, minlength=n_docs) / counts
+        return pd.DataFrame({
+            'Polarity': polarity,
+            'Subjectivity': subjectivity,
+            'Sentiment': label_sentiment(polarity),
+        }, index=texts.index)
@@ -0,0 +1,320 @@
+# core/phrases.py - Frequent bigrams and trigrams, exact while they fit in memory
+#
+# PhraseCounts counts every distinct n-gram exactly, per polarity code, until
+# more than EXACT_PHRASES distinct ones (both sizes, about 50 MB) have been
+# seen: per n-gram size, a sparse matrix of polarity codes by phrases, like
+# Aggregates.terms, so a sentiment's counts are a column sum over a range of
+# rows. The shipped dataset (about 600k distinct phrases) is counted exactly.
+#
+# Past that budget it switches to bounded memory: the exact counts so far are
+# folded into a count-min sketch of n-gram counts, and per n-gram size only
+# the CANDIDATES phrases with the highest estimated counts are kept (heavy
+# hitters, updated as each batch is counted). Memory is then fixed by the
+# sketch's size (levels x DEPTH x 2**WIDTH_BITS 32-bit counters, 10 MiB) and
+# CANDIDATES, whatever the size of the corpus, up to 2**31 n-grams.
+#
+# Rows are counted per polarity code, like Aggregates' tables, so sentiment
+# can still be applied with any thresholds at view time. The sketch counts
+# each n-gram once per dyadic interval of codes containing its row's code
+# (one per level, 10 levels for Aggregates' 401 codes): any range of codes is
+# the union of at most 2 per level, the whole range is a single one.
+#
+# Error bound (0 while counts are exact): with a sketch DEPTH rows deep and
+# 2**WIDTH_BITS wide, each interval's estimate is never below the true count,
+# and with probability at least 1 - e**-DEPTH (98% for DEPTH 4) exceeds it by
+# at most e / 2**WIDTH_BITS x N, where N is the number of n-grams counted
+# (both sizes). A phrase's count over a range of codes adds up at most as
+# many of those errors as intervals it spans (PhraseCounts.error_bound gives
+# the total), and is capped at the estimate over all codes. Estimates at or
+# below the bound may be all error, and are best not shown.
+# Sketched per-sentiment top phrases are picked from the overall candidates,
+# so a phrase only frequent within one sentiment may be missing from its list.
+#
+# The counts are stored apart from the core aggregates (load_phrases), so
+# only the page showing phrases builds and loads them.
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from scipy import sparse
+
+from core.aggregates import CODES, WORD_ROWS, score_code
+from core.backends import backend_id
+from core.config import CACHE_DIR, DATA_PATH
+from core.dataset import ingest, prune, temp_path
+from core.feature_store import iter_features
+
+# Bumped whenever PhraseCounts changes, so older counts are rebuilt
+PHRASES_VERSION = 1
+SIZES = (2, 3)
+# Distinct phrases (both sizes) counted exactly before switching to the sketch
+EXACT_PHRASES = 1_000_000
+WIDTH_BITS = 16
+DEPTH = 4
+# Phrases tracked per n-gram size once sketched, and at most returned by counts()
+CANDIDATES = 1000
+
+
+def _mix(values):
+    # splitmix64's finalizer: spreads every input bit over the whole word
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def word_hashes(words):
+    """64-bit hashes of words, the same in every process (unlike hash())."""
+    return np.array([int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+                     for word in words], dtype=np.uint64)
+
+
+def dyadic_intervals(lo, hi):
+    """[lo, hi) as (level, node) intervals, node covering [node * 2**level, (node + 1) * 2**level)."""
+    intervals = []
+    level = 0
+    while lo < hi:
+        if lo & 1:
+            intervals.append((level, lo))
+            lo += 1
+        if hi & 1:
+            hi -= 1
+            intervals.append((level, hi))
+        lo, hi, level = lo >> 1, hi >> 1, level + 1
+    return intervals
+
+
+def _phrase_texts(dictionary, ids, starts, size):
+    # Texts of the n-grams starting at tokens ``starts``, joined in Arrow
+    words = [dictionary.take(ids[starts + offset]) for offset in range(size)]
+    return pc.binary_join_element_wise(*words, pa.scalar(' ', dictionary.type)).cast(pa.large_string())
+
+
+class PhraseCounts:
+    """Counts of n-grams per polarity code: exact up to ``exact_phrases`` distinct ones, then a count-min sketch
+    with the most frequent phrases of each size."""
+
+    def __init__(self, codes, sizes=SIZES, width_bits=WIDTH_BITS, depth=DEPTH, candidates=CANDIDATES,
+                 exact_phrases=EXACT_PHRASES, seed=0):
+        self.codes = codes
+        self.sizes = tuple(sizes)
+        self.levels = int(np.ceil(np.log2(codes))) + 1
+        self.width_bits = width_bits
+        self.depth = depth
+        self.capacity = candidates
+        self.exact_phrases = exact_phrases
+        # Dataset parts counted so far, in order
+        self.parts = []
+        self.total = 0
+        # Exact counts per size: phrase keys, their texts, and a codes x
+        # phrases matrix; all None once switched to the sketch
+        self.keys = {size: pd.Index([], dtype=np.uint64) for size in self.sizes}
+        self.texts = {size: pa.array([], pa.large_string()) for size in self.sizes}
+        self.matrices = {size: sparse.csr_matrix((codes, 0), dtype=np.int32) for size in self.sizes}
+        self.sketch = None
+        # Multiply-add-shift hashing: an odd multiplier per sketch row, and a
+        # random offset per row and code interval
+        rng = np.random.default_rng(seed)
+        self.seeds = rng.integers(0, 2 ** 63, size=depth, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.offsets = rng.integers(0, 2 ** 64 - 1, size=(self.levels, codes, depth), dtype=np.uint64,
+                                    endpoint=True)
+        self.row_starts = np.arange(depth) << width_bits
+        self.candidates = {size: pd.Series(dtype=object, index=pd.Index([], dtype=np.uint64))
+                           for size in self.sizes}
+
+    @property
+    def exact(self):
+        return self.matrices is not None
+
+    def _columns(self, hashed, level, nodes):
+        # Column of each item (row) in each sketch row (column), as an index
+        # into the flattened sketch rows. Shifted hashes fit any integer type,
+        # so they're reinterpreted rather than converted
+        columns = np.take(self.offsets[level], nodes, axis=0)
+        columns += hashed
+        columns >>= np.uint64(64 - self.width_bits)
+        columns = columns.view(np.intp)
+        columns += self.row_starts
+        return columns
+
+    def _estimate(self, keys, level, node):
+        columns = self._columns(keys[:, None] * self.seeds, level, np.full(len(keys), node))
+        return self.sketch[level].ravel()[columns].min(axis=1)
+
+    def update(self, texts, codes):
+        """Count the n-grams of whitespace-separated ``texts``, each row under its polarity code."""
+        lists = pc.utf8_split_whitespace(pa.array(texts))
+        if isinstance(lists, pa.ChunkedArray):
+            # Arrow-backed texts from more than one record batch
+            lists = lists.combine_chunks()
+        words = pc.list_flatten(lists).dictionary_encode()
+        parents = pc.list_parent_indices(lists).to_numpy()
+        ids = words.indices.to_numpy()
+        hashes = word_hashes(words.dictionary.to_pylist())[ids]
+        token_codes = np.asarray(codes, dtype=np.intp)[parents]
+
+        for size in self.sizes:
+            # Parents never decrease, so an n-gram's first and last words in the same row means all are
+            starts = np.flatnonzero(parents[:len(parents) - size + 1] == parents[size - 1:])
+            if not len(starts):
+                continue
+            keys = np.full(len(starts), size, dtype=np.uint64)
+            for offset in range(size):
+                keys = _mix(keys ^ hashes[starts + offset])
+            phrase_codes = token_codes[starts]
+            self.total += len(starts)
+            if self.exact:
+                self._count(size, keys, phrase_codes, starts, ids, words.dictionary)
+            else:
+                self._add(keys, phrase_codes)
+                self._track(size, keys, starts, ids, words.dictionary)
+        if self.exact and sum(len(keys) for keys in self.keys.values()) > self.exact_phrases:
+            self._to_sketch()
+        return self
+
+    def _count(self, size, keys, phrase_codes, starts, ids, dictionary):
+        # Exact counts: new phrases get the next columns, then this batch's
+        # (code, phrase) pairs are added to the matrix
+        known = self.keys[size]
+        columns = known.get_indexer(keys)
+        new = columns < 0
+        if new.any():
+            added, first, inverse = np.unique(keys[new], return_index=True, return_inverse=True)
+            columns[new] = len(known) + inverse
+            self.keys[size] = known.append(pd.Index(added, dtype=np.uint64))
+            self.texts[size] = pa.concat_arrays([
+                self.texts[size], _phrase_texts(dictionary, ids, starts[np.flatnonzero(new)[first]], size)])
+        shape = (self.codes, len(self.keys[size]))
+        matrix = self.matrices[size]
+        matrix = sparse.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=shape)
+        batch = sparse.csr_matrix((np.ones(len(keys), dtype=np.int32), (phrase_codes, columns)), shape=shape)
+        self.matrices[size] = matrix + batch
+
+    def _to_sketch(self):
+        # Past the exact budget: fold the exact counts into the sketch, and
+        # from then on only track the most frequent phrases of each size
+        self.sketch = np.zeros((self.levels, self.depth, 1 << self.width_bits), dtype=np.int32)
+        for size in self.sizes:
+            keys, matrix = self.keys[size].to_numpy(dtype=np.uint64), self.matrices[size]
+            counts = matrix.tocoo()
+            self._add(keys[counts.col], counts.row, counts.data)
+            totals = np.asarray(matrix.sum(axis=0)).ravel()
+            top = np.argsort(-totals, kind='stable')[:self.capacity]
+            self.candidates[size] = pd.Series(self.texts[size].take(top).to_numpy(zero_copy_only=False),
+                                              index=pd.Index(keys[top], dtype=np.uint64))
+        self.keys = self.texts = self.matrices = None
+
+    def _add(self, keys, codes, weights=None):
+        # Count each key once (or ``weights`` times) per code interval containing its code
+        hashed = keys[:, None] * self.seeds
+        if weights is not None:
+            weights = np.repeat(weights, self.depth)
+        for level in range(self.levels):
+            columns = self._columns(hashed, level, codes >> level)
+            counts = np.bincount(columns.ravel(), weights, minlength=self.sketch[level].size)
+            self.sketch[level] += counts.astype(self.sketch.dtype, copy=False).reshape(self.sketch[level].shape)
+
+    def _track(self, size, keys, starts, ids, dictionary):
+        # Re-rank the tracked phrases together with this batch's new ones by
+        # their estimated totals; only new ones above the lowest tracked
+        # estimate can get in
+        tracked = self.candidates[size]
+        tracked_keys = tracked.index.to_numpy(dtype=np.uint64)
+        tracked_estimates = self._estimate(tracked_keys, self.levels - 1, 0)
+        estimates = self._estimate(keys, self.levels - 1, 0)
+        candidates = np.ones(len(keys), dtype=bool)
+        if len(tracked) >= self.capacity:
+            candidates = estimates > tracked_estimates.min()
+        candidates[candidates] = ~np.isin(keys[candidates], tracked_keys)
+        batch, first = np.unique(keys[candidates], return_index=True)
+        first = np.flatnonzero(candidates)[first]
+        estimates = estimates[first]
+        if len(batch) > self.capacity:
+            best = np.argpartition(-estimates, self.capacity)[:self.capacity]
+            batch, first, estimates = batch[best], first[best], estimates[best]
+        phrases = _phrase_texts(dictionary, ids, starts[first], size).to_numpy(zero_copy_only=False)
+        keys = np.concatenate([tracked_keys, batch])
+        keep = np.argsort(-np.concatenate([tracked_estimates, estimates]), kind='stable')[:self.capacity]
+        self.candidates[size] = pd.Series(np.concatenate([tracked.to_numpy(dtype=object), phrases])[keep],
+                                          index=pd.Index(keys[keep], dtype=np.uint64))
+
+    def counts(self, size, lo=0, hi=None):
+        """Count of the (at most CANDIDATES) most frequent ``size``-word phrases in rows with codes in
+        [lo, hi), highest first: exact, or estimates for the tracked phrases once sketched."""
+        hi = self.codes if hi is None else hi
+        if self.exact:
+            totals = np.asarray(self.matrices[size][lo:hi].sum(axis=0)).ravel()
+            top = np.flatnonzero(totals)
+            if len(top) > self.capacity:
+                top = np.sort(top[np.argpartition(-totals[top], self.capacity)[:self.capacity]])
+            counts = pd.Series(totals[top], name='Count',
+                               index=pd.Index(self.texts[size].take(top).to_pylist(), name='Phrase'))
+            return counts.sort_values(ascending=False, kind='stable')
+        tracked = self.candidates[size]
+        keys = tracked.index.to_numpy(dtype=np.uint64)
+        estimates = self._estimate(keys, self.levels - 1, 0).astype(np.int64)
+        if lo > 0 or hi < self.codes:
+            # A range's count is never more than the phrase's total, which
+            # has the least error
+            ranged = np.zeros(len(keys), dtype=np.int64)
+            for level, node in dyadic_intervals(lo, hi):
+                ranged += self._estimate(keys, level, node)
+            estimates = np.minimum(estimates, ranged)
+        counts = pd.Series(estimates, index=pd.Index(tracked.to_numpy(), name='Phrase'), name='Count')
+        return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+    def error_bound(self, lo=0, hi=None):
+        """Most any count from counts(size, lo, hi) exceeds the true one by, with probability 1 - e**-DEPTH
+        (0 while counts are exact)."""
+        if self.exact:
+            return 0
+        if lo <= 0 and (hi is None or hi >= self.codes):
+            intervals = 1
+        else:
+            intervals = len(dyadic_intervals(lo, self.codes if hi is None else hi))
+        return intervals * np.e / (1 << self.width_bits) * self.total
+
+
+def phrases_path(dataset_id, cache_dir=CACHE_DIR, backend=None):
+    backend = backend or backend_id()
+    return os.path.join(cache_dir, f"phrases-{backend}-{dataset_id}.v{PHRASES_VERSION}.pkl")
+
+
+def load_phrases(path=DATA_PATH, cache_dir=CACHE_DIR, copy=None):
+    """PhraseCounts of the whole dataset's Cleaned_Text, built by streaming it the first time.
+
+    Like load_aggregates, parts appended to the dataset since are counted
+    into the stored counts, which are then saved again. ``copy`` is the
+    (directory, manifest) of the version to count, if not the CSV as it is
+    now.
+    """
+    copy = copy or ingest(path, cache_dir)
+    manifest = copy[1]
+    parts = manifest['parts']
+    store = phrases_path(manifest['id'], cache_dir)
+    phrases = None
+    if os.path.exists(store):
+        with open(store, 'rb') as f:
+            phrases = pickle.load(f)
+        if phrases.parts == parts:
+            return phrases
+    if phrases is None or phrases.parts != parts[:len(phrases.parts)]:
+        phrases = PhraseCounts(CODES)
+
+    for frame in iter_features(['Cleaned_Text', 'Polarity'], path, cache_dir,
+                               parts=parts[len(phrases.parts):], copy=copy):
+        codes = score_code(frame['Polarity'])
+        for start in range(0, len(frame), WORD_ROWS):
+            phrases.update(frame['Cleaned_Text'].iloc[start:start + WORD_ROWS], codes[start:start + WORD_ROWS])
+    phrases.parts = list(parts)
+    tmp = temp_path(store)
+    with open(tmp, 'wb') as f:
+        pickle.dump(phrases, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, store)
+    prune(store, cache_dir)
+    return phrases
@@ -0,0 +1,52 @@
+# core/schema.py - Compact dtypes for the tweet frame
+#
+# Every Streamlit process caches its own copy of the frame, so its footprint
+# bounds how many replicas fit on a node. Repetitive strings are categorical,
+# counts are 32-bit, text is Arrow-backed and timestamps are datetime64.
+# Scores stay float64: the sentiment thresholds are compared exactly.
+import logging
+
+import numpy as np
+import pandas as pd
+
+SENTIMENT_DTYPE = pd.CategoricalDtype(['Negative', 'Neutral', 'Positive'])
+TEXT_DTYPE = pd.StringDtype('pyarrow')
+
+SCHEMA = {
+    'Tweet_ID': 'int64',
+    'Username': 'category',
+    'Text': TEXT_DTYPE,
+    'Retweets': 'int32',
+    'Likes': 'int32',
+    'Timestamp': 'datetime64[ns]',
+    'Polarity': 'float64',
+    'Subjectivity': 'float64',
+    'Sentiment': SENTIMENT_DTYPE,
+    'Cleaned_Text': TEXT_DTYPE,
+    'Text_Length': 'int32',
+}
+
+INT32_RANGE = (np.iinfo(np.int32).min, np.iinfo(np.int32).max)
+
+logger = logging.getLogger(__name__)
+
+
+def apply_schema(df):
+    """Return df with every SCHEMA column it has cast to its compact dtype."""
+    dtypes = {column: dtype for column, dtype in SCHEMA.items() if column in df.columns}
+    for column, dtype in dtypes.items():
+        # astype would wrap out-of-range counts around silently
+        if dtype == 'int32' and len(df) and not df[column].between(*INT32_RANGE).all():
+            raise ValueError(f"{column} has values outside int32; widen it in core.schema.SCHEMA")
+    return df.astype(dtypes)
+
+
+def frame_memory(df):
+    """Deep memory use of df in bytes."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def log_memory(before, after, label="Frame"):
+    """Log deep memory use in bytes before and after apply_schema."""
+    logger.info("%s memory: %.2f MiB -> %.2f MiB with the compact schema (%.0f%% smaller)",
+                label, before / 2 ** 20, after / 2 ** 20, 100 * (1 - after / max(before, 1)))
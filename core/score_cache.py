@@ -0,0 +1,183 @@
+# core/score_cache.py - Persistent text -> score memo in front of the scorer
+#
+# Scores are keyed by a hash of the text (and the scorer that produced them),
+# held in an in-process LRU and backed by a SQLite table on local disk, so the
+# same text is scored once across pages, reruns and server restarts. Both
+# layers are size-bounded and evict least recently used entries.
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core.backends import get_backend
+from core.config import CACHE_DIR
+from core.sentiment import label_sentiment, score_texts
+
+CACHE_PATH = os.path.join(CACHE_DIR, "scores.sqlite")
+MEMORY_SIZE = 20_000
+DISK_SIZE = 2_000_000
+# SQLite caps the number of bound parameters per statement
+_BATCH = 500
+# A full disk cache evicts this fraction of its entries at once, so the table
+# is only recounted every so often
+DISK_HEADROOM = 0.1
+
+
+def text_key(text, namespace="textblob"):
+    return hashlib.blake2b(f"{namespace}\0{text}".encode('utf-8'), digest_size=16).digest()
+
+
+class ScoreCache:
+    def __init__(self, path=CACHE_PATH, memory_size=MEMORY_SIZE, disk_size=DISK_SIZE,
+                 namespace="textblob", scorer=score_texts):
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.namespace = namespace
+        self.scorer = scorer
+        self.memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+        # Upper bound on the table's rows (replaced keys count twice), kept
+        # instead of counting them on every store
+        self._rows = None
+
+    def _connect(self):
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS scores (key BLOB PRIMARY KEY, polarity REAL,"
+                             " subjectivity REAL, last_used REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+        return self._db
+
+    def _remember(self, key, score):
+        self.memory[key] = score
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def _lookup(self, keys):
+        found = {}
+        missing = []
+        for key in keys:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                found[key] = self.memory[key]
+            else:
+                missing.append(key)
+        self.memory_hits += len(found)
+
+        db = self._connect()
+        now = time.time()
+        for start in range(0, len(missing), _BATCH):
+            batch = missing[start:start + _BATCH]
+            marks = ','.join('?' * len(batch))
+            rows = db.execute(f"SELECT key, polarity, subjectivity FROM scores WHERE key IN ({marks})",
+                              batch).fetchall()
+            if rows:
+                db.execute(f"UPDATE scores SET last_used = ? WHERE key IN ({marks})", [now] + batch)
+            for key, polarity, subjectivity in rows:
+                found[key] = (polarity, subjectivity)
+                self._remember(key, (polarity, subjectivity))
+                self.disk_hits += 1
+        db.commit()
+        return found
+
+    def _store(self, scores):
+        db = self._connect()
+        now = time.time()
+        db.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)",
+                       [(key, polarity, subjectivity, now) for key, (polarity, subjectivity) in scores.items()])
+        for key, score in scores.items():
+            self._remember(key, score)
+        if self._rows is None:
+            self._rows = self._count()
+        else:
+            self._rows += len(scores)
+        if self._rows > self.disk_size:
+            # Recounted, as other processes write to the table too
+            excess = self._count() - int(self.disk_size * (1 - DISK_HEADROOM))
+            if excess > 0:
+                db.execute("DELETE FROM scores WHERE key IN "
+                           "(SELECT key FROM scores ORDER BY last_used LIMIT ?)", (excess,))
+            self._rows = self._count()
+        db.commit()
+
+    def _count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def score_texts(self, texts):
+        """Like sentiment.score_texts, scoring only texts not already cached."""
+        texts = pd.Series(texts)
+        values = [str(text) for text in texts]
+        keys = [text_key(value, self.namespace) for value in values]
+        with self._lock:
+            found = self._lookup(keys)
+            todo = [i for i, key in enumerate(keys) if key not in found]
+            self.misses += len(todo)
+        if todo:
+            # Scored without the lock, so a large batch doesn't hold up other
+            # callers' lookups; texts two callers miss at once are scored twice
+            fresh = self.scorer([values[i] for i in todo])
+            scored = zip(fresh['Polarity'].tolist(), fresh['Subjectivity'].tolist())
+            new = {keys[i]: score for i, score in zip(todo, scored)}
+            with self._lock:
+                self._store(new)
+            found.update(new)
+        scores = np.array([found[key] for key in keys], dtype=float).reshape(-1, 2)
+        return pd.DataFrame({
+            'Polarity': scores[:, 0],
+            'Subjectivity': scores[:, 1],
+            'Sentiment': label_sentiment(scores[:, 0]),
+        }, index=texts.index)
+
+    def score_text(self, text):
+        """Return (polarity, subjectivity) for one text."""
+        row = self.score_texts([text]).iloc[0]
+        return float(row['Polarity']), float(row['Subjectivity'])
+
+    def stats(self):
+        with self._lock:
+            disk_entries = self._count()
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_entries': len(self.memory),
+                'disk_entries': disk_entries,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide ScoreCache for the configured backend.
+
+    Sized by SCORE_CACHE_MEMORY_SIZE / SCORE_CACHE_DISK_SIZE, and keyed on
+    the backend's id (core.backends).
+    """
+    global _cache
+    with _cache_lock:
+        backend = get_backend()
+        if _cache is None:
+            _cache = ScoreCache(memory_size=int(os.environ.get('SCORE_CACHE_MEMORY_SIZE', MEMORY_SIZE)),
+                                disk_size=int(os.environ.get('SCORE_CACHE_DISK_SIZE', DISK_SIZE)),
+                                namespace=backend.id, scorer=backend.score)
+        else:
+            # Keys include the namespace, so once the backend's id changes
+            # (a retrained model) no earlier score is served
+            _cache.namespace = backend.id
+        return _cache
@@ -0,0 +1,103 @@
+# core/sentiment.py - Single-pass TextBlob scoring shared by every page
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from textblob.sentiments import PatternAnalyzer
+
+from core.schema import SENTIMENT_DTYPE
+
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+# Below this many texts a process pool costs more to start than it saves
+PARALLEL_MIN_TEXTS = 5000
+CHUNKS_PER_WORKER = 4
+# Workers are started from a clean server process: forking Streamlit's
+# threaded server could copy a lock some other thread holds
+START_METHOD = 'forkserver'
+
+# TextBlob(text).sentiment just hands the raw string to this analyzer, so
+# calling it directly skips building a blob per text
+_analyzer = PatternAnalyzer()
+
+
+def score_text(text):
+    """Return (polarity, subjectivity) for one text."""
+    polarity, subjectivity = _analyzer.analyze(str(text))
+    return polarity, subjectivity
+
+
+def label_sentiment(polarity, negative=NEGATIVE_THRESHOLD, positive=POSITIVE_THRESHOLD):
+    polarity = np.asarray(polarity, dtype=float)
+    return np.select([polarity > positive, polarity < negative],
+                     ['Positive', 'Negative'], default='Neutral')
+
+
+def with_sentiment(df, negative=NEGATIVE_THRESHOLD, positive=POSITIVE_THRESHOLD):
+    """Return df with a Sentiment column labelled from its Polarity column.
+
+    Only raw scores are stored, so moving the thresholds is one vectorized
+    pass over Polarity rather than a re-score.
+    """
+    polarity = df['Polarity'].to_numpy()
+    codes = np.select([polarity > positive, polarity < negative], [2, 0], default=1)
+    return df.assign(Sentiment=pd.Categorical.from_codes(codes, dtype=SENTIMENT_DTYPE))
+
+
+def _score_chunk(texts):
+    return [score_text(text) for text in texts]
+
+
+def default_workers():
+    return int(os.environ.get('SENTIMENT_WORKERS', os.cpu_count() or 1))
+
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    # One pool per process, kept across calls; replaced if asked for a different size
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context(START_METHOD))
+            _pool_workers = workers
+        return _pool
+
+
+def _score_parallel(texts, workers):
+    # Contiguous chunks mapped in order, so the result matches the serial run
+    n_chunks = min(len(texts), workers * CHUNKS_PER_WORKER)
+    bounds = np.linspace(0, len(texts), n_chunks + 1, dtype=int)
+    chunks = [texts[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    return [score for chunk in _get_pool(workers).map(_score_chunk, chunks) for score in chunk]
+
+
+def score_texts(texts, workers=None):
+    """Score every text once and return Polarity, Subjectivity and Sentiment columns.
+
+    Large inputs are split into chunks and scored across ``workers`` processes
+    (default: SENTIMENT_WORKERS or the CPU count); small ones run serially.
+    """
+    texts = pd.Series(texts)
+    workers = default_workers() if workers is None else workers
+    values = [str(text) for text in texts]
+    if workers > 1 and len(values) >= PARALLEL_MIN_TEXTS:
+        scores = _score_parallel(values, workers)
+    else:
+        scores = _score_chunk(values)
+    scores = np.array(scores, dtype=float).reshape(-1, 2)
+    return pd.DataFrame({
+        'Polarity': scores[:, 0],
+        'Subjectivity': scores[:, 1],
+        'Sentiment': label_sentiment(scores[:, 0]),
+    }, index=texts.index)
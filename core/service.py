@@ -0,0 +1,222 @@
+# core/service.py - Local HTTP scoring service with micro-batching
+#
+# Usage: python -m core.service [--host 127.0.0.1] [--port 8502] [--max-batch 256] [--max-wait-ms 5]
+#
+#   POST /score  {"text": "..."} or {"texts": ["...", ...]}
+#                optional "negative"/"positive" polarity thresholds
+#             -> {"results": [{"polarity": .., "subjectivity": .., "sentiment": ..}, ...]}
+#   GET  /stats  queue depth, batch-size and latency counters
+#   GET  /health
+#
+# Requests arriving together are merged into one call to the dashboard's
+# cached scorer (the one 07_Tweet_Analyzer.py uses): the batcher waits at most
+# max_wait for more texts after the first one, or until max_batch texts are
+# queued. python -m core.benchmark service drives it with concurrent clients.
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from core.score_cache import get_cache
+from core.sentiment import NEGATIVE_THRESHOLD, POSITIVE_THRESHOLD, label_sentiment
+
+MAX_BATCH = 256
+MAX_WAIT_MS = 5.0
+# Requests larger than this are rejected rather than stalling everyone else
+MAX_REQUEST_TEXTS = 10_000
+# Per-batch latencies kept for the /stats percentiles
+STATS_WINDOW = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Merges concurrent score requests into batched scorer calls on one worker thread."""
+
+    def __init__(self, scorer=None, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        # The process-wide cache as it is on each call, which follows the backend's current model
+        self.scorer = scorer or (lambda texts: get_cache().score_texts(texts))
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.pending = queue.Queue()
+        self.queued_texts = 0
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self.largest_batch = 0
+        self.batch_sizes = np.zeros(0, dtype=int)
+        self.score_ms = np.zeros(0)
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, texts):
+        """Queue texts for scoring; returns a Future of their (polarity, subjectivity) arrays."""
+        future = Future()
+        with self._lock:
+            self.queued_texts += len(texts)
+            self.requests += 1
+        self.pending.put((list(texts), future))
+        return future
+
+    def _collect(self):
+        # Block for the first request, then take whatever else arrives within
+        # the wait window until the batch is full
+        batch = [self.pending.get()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch, size
+
+    def _run(self):
+        while True:
+            batch, size = self._collect()
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            start = time.perf_counter()
+            try:
+                scores = self.scorer(texts)
+            except Exception as exc:
+                logger.exception("Scoring a batch of %d texts failed", size)
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            finally:
+                self._record(size, (time.perf_counter() - start) * 1000)
+            polarity = scores['Polarity'].to_numpy()
+            subjectivity = scores['Subjectivity'].to_numpy()
+            offset = 0
+            for item_texts, future in batch:
+                end = offset + len(item_texts)
+                future.set_result((polarity[offset:end], subjectivity[offset:end]))
+                offset = end
+
+    def _record(self, size, elapsed_ms):
+        with self._lock:
+            self.queued_texts -= size
+            self.batches += 1
+            self.texts += size
+            self.largest_batch = max(self.largest_batch, size)
+            self.batch_sizes = np.append(self.batch_sizes, size)[-STATS_WINDOW:]
+            self.score_ms = np.append(self.score_ms, elapsed_ms)[-STATS_WINDOW:]
+
+    def stats(self):
+        with self._lock:
+            recent = len(self.batch_sizes) > 0
+            return {
+                'queue_depth': self.queued_texts,
+                'requests': self.requests,
+                'batches': self.batches,
+                'texts': self.texts,
+                'mean_batch_size': float(self.batch_sizes.mean()) if recent else 0.0,
+                'largest_batch': self.largest_batch,
+                'batch_score_ms_p50': float(np.percentile(self.score_ms, 50)) if recent else 0.0,
+                'batch_score_ms_p99': float(np.percentile(self.score_ms, 99)) if recent else 0.0,
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+            }
+
+
+class ScoreHandler(BaseHTTPRequestHandler):
+    batcher = None
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self._send(200, self.batcher.stats())
+        elif self.path == '/health':
+            self._send(200, {'status': 'ok'})
+        else:
+            self._send(404, {'error': f"no route {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/score':
+            self._send(404, {'error': f"no route {self.path}"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            texts = [body['text']] if 'text' in body else body['texts']
+            if not isinstance(texts, list) or len(texts) > MAX_REQUEST_TEXTS:
+                raise ValueError(f"'texts' must be a list of at most {MAX_REQUEST_TEXTS} strings")
+            negative = float(body.get('negative', NEGATIVE_THRESHOLD))
+            positive = float(body.get('positive', POSITIVE_THRESHOLD))
+        except (KeyError, TypeError, ValueError, AttributeError) as exc:
+            self._send(400, {'error': f"expected {{\"text\": ...}} or {{\"texts\": [...]}}: {exc}"})
+            return
+
+        if not texts:
+            self._send(200, {'results': []})
+            return
+        try:
+            polarity, subjectivity = self.batcher.submit([str(text) for text in texts]).result()
+        except Exception as exc:
+            self._send(500, {'error': str(exc)})
+            return
+        labels = label_sentiment(polarity, negative, positive)
+        self._send(200, {'results': [
+            {'polarity': float(p), 'subjectivity': float(s), 'sentiment': str(label)}
+            for p, s, label in zip(polarity, subjectivity, labels)
+        ]})
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class ScoreServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 drops connections under concurrent load,
+    # and each retried SYN costs a full second of latency
+    request_queue_size = 256
+
+
+def make_server(host='127.0.0.1', port=8502, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+    handler = type('BoundScoreHandler', (ScoreHandler,),
+                   {'batcher': MicroBatcher(max_batch=max_batch, max_wait_ms=max_wait_ms)})
+    return ScoreServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.service",
+                                     description="Serve sentiment scores over HTTP with micro-batching.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help="texts per scorer call")
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS,
+                        help="how long the first queued text waits for others to join its batch")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    server = make_server(args.host, args.port, args.max_batch, args.max_wait_ms)
+    logger.info("Scoring on http://%s:%d (max batch %d, max wait %.1f ms)",
+                args.host, args.port, args.max_batch, args.max_wait_ms)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
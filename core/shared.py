@@ -0,0 +1,58 @@
+# core/shared.py - One read-only frame per dataset version, shared by every session
+#
+# st.cache_data pickles its return value and hands every caller a copy, so
+# each concurrent session held its own copy of the dataset. Instead the
+# process keeps one frame per dataset version (and column set), sorted by
+# Timestamp, and callers get views of it: a date range is a row slice, and
+# with pandas' copy-on-write a caller that modifies its view only copies the
+# columns it touches, never the shared frame. The previous version is kept
+# too, for sessions still rendering it when core.watcher swaps a new one in.
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from core.feature_store import FEATURE_COLUMNS, load_features
+from core.watcher import dataset_copy, load_version
+
+# Dataset versions kept per column set: the current one and the one before
+SHARED_VERSIONS = 2
+
+_frames = OrderedDict()
+_frames_lock = threading.Lock()
+
+
+def shared_frame(version, columns=None):
+    """The dataset at ``version`` (``columns`` and Timestamp only, if given), sorted by Timestamp.
+
+    ``version`` is one core.watcher serves, read exactly as it was then. The
+    same frame is returned to every caller: take views of it (frame_view)
+    rather than modifying it.
+    """
+    columns = None if columns is None else tuple(columns)
+    key = (version, columns)
+    with _frames_lock:
+        if key not in _frames:
+            read = columns if columns is None or 'Timestamp' in columns else columns + ('Timestamp',)
+            if read is None or set(read) & set(FEATURE_COLUMNS):
+                # Scored once per version, then kept up to date by the watcher
+                load_version('features', version)
+            df = load_features(None if read is None else list(read), copy=dataset_copy(version))
+            _frames[key] = df.sort_values('Timestamp', kind='stable', na_position='last', ignore_index=True)
+            stale = [other for other in _frames if other[1] == columns and other != key]
+            for other in stale[:max(len(stale) - SHARED_VERSIONS + 1, 0)]:
+                del _frames[other]
+        return _frames[key]
+
+
+def frame_view(version, columns=None, start=None, end=None):
+    """Rows of shared_frame between the dates ``start`` and ``end`` (inclusive), without copying them."""
+    df = shared_frame(version, columns)
+    if start is not None or end is not None:
+        # Timestamps are sorted with the missing ones last, so the range is a slice
+        timestamps = df['Timestamp'].iloc[:df['Timestamp'].count()]
+        lo = 0 if start is None else timestamps.searchsorted(pd.Timestamp(start))
+        hi = (len(timestamps) if end is None else
+              timestamps.searchsorted(pd.Timestamp(end) + pd.Timedelta(days=1)))
+        df = df.iloc[lo:hi].reset_index(drop=True)
+    return df if columns is None else df[list(columns)]
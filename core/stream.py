@@ -0,0 +1,111 @@
+# core/stream.py - Scores a CSV or JSONL file chunk by chunk
+#
+# Usage: python -m core.stream [input] [-o output] [--chunk-size N] [--format csv|jsonl]
+#
+# Rows are read, scored and written one fixed-size chunk at a time, so memory
+# stays flat however large the input is. Input and output default to stdin and
+# stdout. Texts are scored through the same cached backend as the dashboard
+# (config.SENTIMENT_BACKEND), and each distinct text in a chunk once.
+import argparse
+import logging
+import os
+import sys
+import time
+
+import pandas as pd
+
+from core.feature_store import dedup_index
+from core.score_cache import get_cache
+from core.sentiment import NEGATIVE_THRESHOLD, POSITIVE_THRESHOLD, label_sentiment
+
+CHUNK_SIZE = 10_000
+SCORE_COLUMNS = ['Polarity', 'Subjectivity', 'Sentiment']
+# Both formats write floats with 15 significant digits (JSON's maximum), so
+# the same text gets the same scores in either
+DOUBLE_PRECISION = 15
+
+logger = logging.getLogger(__name__)
+
+
+def detect_format(path):
+    return 'jsonl' if str(path).endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_chunks(source, fmt, chunk_size=CHUNK_SIZE):
+    # Everything is read as strings so unscored columns pass through unchanged
+    if fmt == 'jsonl':
+        return pd.read_json(source, lines=True, chunksize=chunk_size, dtype=False)
+    return pd.read_csv(source, chunksize=chunk_size, dtype=str, keep_default_na=False)
+
+
+def score_chunk(chunk, text_column='Text', negative=NEGATIVE_THRESHOLD, positive=POSITIVE_THRESHOLD):
+    """Return the chunk with Polarity, Subjectivity and Sentiment columns added."""
+    codes, distinct = dedup_index(chunk[text_column])
+    scores = get_cache().score_texts(distinct).iloc[codes].set_axis(chunk.index)
+    scores['Sentiment'] = label_sentiment(scores['Polarity'], negative, positive)
+    return chunk.assign(**{column: scores[column] for column in SCORE_COLUMNS})
+
+
+def write_chunk(chunk, sink, fmt, first):
+    if fmt == 'jsonl':
+        # Every record, the last one included, ends with a newline
+        chunk.to_json(sink, orient='records', lines=True, force_ascii=False,
+                      double_precision=DOUBLE_PRECISION)
+    else:
+        chunk.to_csv(sink, index=False, header=first, float_format=f'%.{DOUBLE_PRECISION}g')
+    sink.flush()
+
+
+def stream_scores(source, sink, in_format='csv', out_format='csv', chunk_size=CHUNK_SIZE,
+                  text_column='Text', negative=NEGATIVE_THRESHOLD, positive=POSITIVE_THRESHOLD):
+    """Score source into sink chunk by chunk; returns the number of rows written."""
+    rows = 0
+    start = time.perf_counter()
+    with read_chunks(source, in_format, chunk_size) as chunks:
+        for chunk in chunks:
+            if text_column not in chunk.columns:
+                raise ValueError(f"Input has no {text_column!r} column")
+            write_chunk(score_chunk(chunk, text_column, negative, positive), sink, out_format, rows == 0)
+            rows += len(chunk)
+            logger.info("%d rows scored (%.0f rows/s)", rows, rows / (time.perf_counter() - start))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.stream",
+                                     description="Add sentiment scores to a CSV or JSONL file of tweets.")
+    parser.add_argument('input', nargs='?', default='-', help="input file (default: stdin)")
+    parser.add_argument('-o', '--output', default='-', help="output file (default: stdout)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'],
+                        help="input format (default: from the file extension, csv for stdin)")
+    parser.add_argument('--output-format', choices=['csv', 'jsonl'],
+                        help="output format (default: same as the input)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="rows held in memory at a time")
+    parser.add_argument('--text-column', default='Text')
+    parser.add_argument('--negative', type=float, default=NEGATIVE_THRESHOLD,
+                        help="polarity below this is labelled Negative")
+    parser.add_argument('--positive', type=float, default=POSITIVE_THRESHOLD,
+                        help="polarity above this is labelled Positive")
+    parser.add_argument('-q', '--quiet', action='store_true', help="no progress on stderr")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format="%(message)s", stream=sys.stderr)
+
+    in_format = args.format or detect_format(args.input)
+    out_format = args.output_format or (detect_format(args.output) if args.output != '-' else in_format)
+    source = sys.stdin if args.input == '-' else args.input
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        stream_scores(source, sink, in_format, out_format, args.chunk_size,
+                      args.text_column, args.negative, args.positive)
+    except BrokenPipeError:
+        # Output piped into something like head that stopped reading; point
+        # stdout at devnull so the interpreter's final flush doesn't fail too
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
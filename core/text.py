@@ -0,0 +1,45 @@
+# core/text.py - Tweet text cleaning shared by the pages and the feature store
+#
+# Cleaning lowercases the text, drops mentions, hashtags and links, then
+# digits and punctuation, and collapses whitespace. Mentions, hashtags and
+# links are one precompiled alternation, only run on texts that can contain
+# one; digits and punctuation are single characters, deleted with a
+# translate table when the text is ASCII. Each text is split once, for both
+# Cleaned_Text and its word count.
+import re
+
+import pandas as pd
+
+# A link whose tail is only mentions and hashtags is kept: removing those
+# first leaves a bare "http", which isn't a link
+LINK_PATTERN = re.compile(r'@\w+|#\w+|http(?!(?:[@#]\w+)*(?:\s|\Z))\S+')
+CHAR_PATTERN = re.compile(r'\d|[^\w\s]')
+ASCII_DROP = bytes(code for code in range(128) if CHAR_PATTERN.match(chr(code)))
+
+
+def clean_words(text):
+    text = str(text).lower()
+    if '@' in text or '#' in text or 'http' in text:
+        text = LINK_PATTERN.sub('', text)
+    if text.isascii():
+        text = text.encode('ascii').translate(None, ASCII_DROP).decode('ascii')
+    else:
+        text = CHAR_PATTERN.sub('', text)
+    return text.split()
+
+
+def clean_text(text):
+    return ' '.join(clean_words(text))
+
+
+def clean_texts(texts):
+    """Return (Cleaned_Text, Text_Length) Series for texts, as clean_text and its word count."""
+    texts = pd.Series(texts)
+    cleaned = []
+    lengths = []
+    for text in texts:
+        words = clean_words(text)
+        cleaned.append(' '.join(words))
+        lengths.append(len(words))
+    return (pd.Series(cleaned, index=texts.index, name='Cleaned_Text'),
+            pd.Series(lengths, index=texts.index, name='Text_Length'))
@@ -0,0 +1,170 @@
+# core/watcher.py - Background reload of the dataset when the CSV changes
+#
+# A daemon thread checks the CSV every WATCH_INTERVAL seconds (a stat while it
+# is unchanged, see core.dataset.ingest). When it changed, the thread brings
+# the columnar copy up to date, then whatever pages have loaded for the
+# version being served (feature store, aggregates, phrases), incrementally if
+# rows were only appended, and only then swaps the new version in. Pages key
+# their caches on current_version() and load exactly that version with
+# load_version, so every session picks the new version up on its next rerun
+# without waiting for the rebuild, while a session already rendering keeps
+# the version it started with.
+#
+# A version is the backend's id (core.backends) and the CSV's, so retraining
+# the distilled model is picked up like a change to the CSV.
+#
+# Checking the version only needs the columnar copy: the landing page never
+# scores the dataset, and a cold start only builds what the first page that
+# needs it asks for.
+import logging
+import threading
+import time
+
+from core.aggregates import load_aggregates
+from core.backends import backend_id
+from core.config import CACHE_DIR, DATA_PATH, WATCH_INTERVAL
+from core.dataset import ingest, prune_versions, source_stat, version_id
+from core.feature_store import build_store
+from core.phrases import load_phrases
+
+# Versions whose copies and loads are kept: the current one, and the one
+# before for sessions still rendering it
+SERVED_VERSIONS = 2
+
+# What pages load per version, each a function of (path, cache_dir, copy)
+LOADERS = {
+    'features': lambda path, cache_dir, copy: build_store(*copy, cache_dir),
+    'aggregates': load_aggregates,
+    'phrases': load_phrases,
+}
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetWatcher:
+    """Keeps the dataset's caches up to date with the CSV from a background thread."""
+
+    def __init__(self, path=DATA_PATH, cache_dir=CACHE_DIR, interval=WATCH_INTERVAL):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.interval = interval
+        self.version = None
+        self.reloads = 0
+        # (directory, manifest) of each served version, and what was loaded for it
+        self._copies = {}
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self._load_locks = {kind: threading.Lock() for kind in LOADERS}
+        self._stopped = threading.Event()
+        self._thread = None
+        self._failed = None
+
+    def refresh(self):
+        """Bring the caches in use up to date with the CSV; return the version being served."""
+        with self._lock:
+            copy = ingest(self.path, self.cache_dir)
+            # Scores change with the backend's model as well as with the CSV
+            version = f"{backend_id()}-{version_id(copy[1])}"
+            if version != self.version:
+                start = time.perf_counter()
+                # Re-added last if the CSV went back to an earlier version
+                self._copies.pop(version, None)
+                self._copies[version] = copy
+                for kind in [kind for kind, loaded in list(self._loaded) if loaded == self.version]:
+                    self.load(kind, version)
+                if self.version is not None:
+                    self.reloads += 1
+                    logger.info("Reloaded %s as version %s in %.2fs", self.path, version,
+                                time.perf_counter() - start)
+                # A single assignment: readers see either the old version or the complete new one
+                self.version = version
+                self._forget()
+            return self.version
+
+    def _forget(self):
+        served = list(self._copies)[-SERVED_VERSIONS:]
+        # Page threads add loads meanwhile: iterate over snapshots
+        for version in [version for version in list(self._copies) if version not in served]:
+            del self._copies[version]
+        for key in [key for key in list(self._loaded) if key[1] not in served]:
+            self._loaded.pop(key, None)
+        # Caches of versions no longer served (and of any from before this
+        # process started) are only deleted now, not when a new one is built
+        prune_versions([(version.rsplit('-', 1)[0], manifest) for version, (_, manifest) in self._copies.items()],
+                       self.cache_dir)
+
+    def current(self):
+        """The version pages should render; only the first call waits, for the columnar copy."""
+        if self.version is None or self._thread is None:
+            return self.refresh()
+        return self.version
+
+    def copy(self, version):
+        """(directory, manifest) of a served version, to read exactly that version."""
+        return self._copies[version]
+
+    def load(self, kind, version):
+        """The ``kind`` (see LOADERS) of a served version, built on first use.
+
+        Kept per version and rebuilt for each new version before it is
+        served, so after its first use a kind never keeps a request waiting.
+        """
+        key = (kind, version)
+        if key not in self._loaded:
+            with self._load_locks[kind]:
+                if key not in self._loaded:
+                    self._loaded[key] = LOADERS[kind](self.path, self.cache_dir, self.copy(version))
+        return self._loaded[key]
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="dataset-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            stat = None
+            try:
+                stat = source_stat(self.path)
+                if stat != self._failed:
+                    self.refresh()
+            except Exception:
+                # An edit caught half-written, say: keep serving the last good
+                # version, and retry once the file changes again
+                self._failed = stat
+                logger.exception("Reloading %s failed; still serving version %s", self.path, self.version)
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher():
+    """Process-wide DatasetWatcher for the configured CSV, started on first use.
+
+    Polls every TWITTER_WATCH_INTERVAL seconds; 0 disables the thread and
+    checks the CSV on every call instead.
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = DatasetWatcher().start()
+        return _watcher
+
+
+def current_version():
+    return get_watcher().current()
+
+
+def dataset_copy(version):
+    """(directory, manifest) of ``version``, as returned by current_version()."""
+    return get_watcher().copy(version)
+
+
+def load_version(kind, version):
+    """The ``kind`` ('features', 'aggregates' or 'phrases') of ``version``, as returned by current_version()."""
+    return get_watcher().load(kind, version)
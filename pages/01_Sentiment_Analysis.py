@@ -3,9 +3,11 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from textblob import TextBlob
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
+from core.controls import load_served, sentiment_thresholds
+from core.watcher import current_version
+from core.sentiment import with_sentiment
 
 st.set_page_config(page_title="Sentiment Analysis", layout="wide")
 
@@ -75,15 +77,6 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_and_process_data():
-    df = pd.read_csv("./Data/twitter_dataset.csv")
-    df['Sentiment'] = df['Text'].apply(lambda x: 'Positive' if TextBlob(str(x)).sentiment.polarity > 0.1 
-                                       else ('Negative' if TextBlob(str(x)).sentiment.polarity < -0.1 else 'Neutral'))
-    df['Polarity'] = df['Text'].apply(lambda x: TextBlob(str(x)).sentiment.polarity)
-    df['Subjectivity'] = df['Text'].apply(lambda x: TextBlob(str(x)).sentiment.subjectivity)
-    return df
-
 st.markdown("""
     <div class='page-header'>
         <h1>Emotional Landscape: Understanding Sentiment</h1>
@@ -91,7 +84,13 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-df = load_and_process_data()
+negative_threshold, positive_threshold = sentiment_thresholds()
+aggregates = load_served('aggregates', current_version())
+sentiment_counts = aggregates.sentiment_counts(negative_threshold, positive_threshold)
+polarity_stats = aggregates.stats('Polarity')
+subjectivity_stats = aggregates.stats('Subjectivity')
+# Scatter and box plots draw their points from the aggregates' uniform sample
+df = with_sentiment(aggregates.sample, negative_threshold, positive_threshold)
 
 st.markdown("""
     <div class='story-text'>
@@ -118,38 +117,38 @@ st.markdown("""
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    positive_count = (df['Sentiment'] == 'Positive').sum()
+    positive_count = sentiment_counts.get('Positive', 0)
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Positive Sentiment</div>
             <div style='font-size: 2em; font-weight: bold; color: #2ecc71; margin: 10px 0;'>{positive_count}</div>
-            <div style='color: #657786; font-size: 0.9em;'>{positive_count/len(df)*100:.1f}% of all</div>
+            <div style='color: #657786; font-size: 0.9em;'>{positive_count/aggregates.rows*100:.1f}% of all</div>
         </div>
     """, unsafe_allow_html=True)
 
 with col2:
-    neutral_count = (df['Sentiment'] == 'Neutral').sum()
+    neutral_count = sentiment_counts.get('Neutral', 0)
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Neutral Sentiment</div>
             <div style='font-size: 2em; font-weight: bold; color: #95a5a6; margin: 10px 0;'>{neutral_count}</div>
-            <div style='color: #657786; font-size: 0.9em;'>{neutral_count/len(df)*100:.1f}% of all</div>
+            <div style='color: #657786; font-size: 0.9em;'>{neutral_count/aggregates.rows*100:.1f}% of all</div>
         </div>
     """, unsafe_allow_html=True)
 
 with col3:
-    negative_count = (df['Sentiment'] == 'Negative').sum()
+    negative_count = sentiment_counts.get('Negative', 0)
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Negative Sentiment</div>
             <div style='font-size: 2em; font-weight: bold; color: #e74c3c; margin: 10px 0;'>{negative_count}</div>
-            <div style='color: #657786; font-size: 0.9em;'>{negative_count/len(df)*100:.1f}% of all</div>
+            <div style='color: #657786; font-size: 0.9em;'>{negative_count/aggregates.rows*100:.1f}% of all</div>
         </div>
     """, unsafe_allow_html=True)
 
 with col4:
-    avg_polarity = df['Polarity'].mean()
-    polarity_label = "Optimistic" if avg_polarity > 0.1 else ("Pessimistic" if avg_polarity < -0.1 else "Balanced")
+    avg_polarity = polarity_stats['mean']
+    polarity_label = "Optimistic" if avg_polarity > positive_threshold else ("Pessimistic" if avg_polarity < negative_threshold else "Balanced")
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Overall Tone</div>
@@ -174,7 +173,6 @@ st.markdown("""
 col1, col2 = st.columns(2)
 
 with col1:
-    sentiment_counts = df['Sentiment'].value_counts()
     fig_pie = px.pie(values=sentiment_counts.values, names=sentiment_counts.index,
                      color_discrete_map={'Positive': '#2ecc71', 'Negative': '#e74c3c', 'Neutral': '#95a5a6'},
                      title="Sentiment Distribution")
@@ -183,7 +181,6 @@ with col1:
     st.markdown("</div>", unsafe_allow_html=True)
 
 with col2:
-    sentiment_counts = df['Sentiment'].value_counts()
     fig_bar = px.bar(x=sentiment_counts.index, y=sentiment_counts.values,
                      color=sentiment_counts.index,
                      color_discrete_map={'Positive': '#2ecc71', 'Negative': '#e74c3c', 'Neutral': '#95a5a6'},
@@ -197,7 +194,7 @@ st.markdown("<div style='height: 20px;'></div>", unsafe_allow_html=True)
 
 st.markdown("""
     <div class='insight-box'>
-        The sentiment distribution shows the foundation of all engagement. With """ + f"{positive_count/len(df)*100:.0f}% positive" + 
+        The sentiment distribution shows the foundation of all engagement. With """ + f"{positive_count/aggregates.rows*100:.0f}% positive" + 
         """ conversations, we're seeing an audience that tends toward constructive engagement. Understanding this 
         baseline helps us interpret all other metrics.
     </div>
@@ -222,10 +219,11 @@ with col1:
     #
     
     st.write("**What is Polarity?** It measures how positive (-1) to negative (+1) a piece of text is.")
-    fig_polarity = px.histogram(df, x='Polarity', nbins=40,
+    polarity_hist = aggregates.histogram('Polarity')
+    fig_polarity = px.histogram(x=polarity_hist.index, y=polarity_hist.values, histfunc='sum', nbins=40,
                                 title="Distribution of Polarity Scores",
                                 color_discrete_sequence=['#1DA1F2'],
-                                labels={'Polarity': 'Polarity Score', 'count': 'Frequency'})
+                                labels={'x': 'Polarity Score', 'y': 'Frequency'})
     fig_polarity.update_xaxes(title_text="Polarity Score")
     fig_polarity.update_yaxes(title_text="Number of Tweets")
     st.plotly_chart(fig_polarity, use_container_width=True)
@@ -235,10 +233,11 @@ with col2:
     #
     
     st.write("**What is Subjectivity?** It measures how much opinion (1) vs. fact (0) a piece of text contains.")
-    fig_subjectivity = px.histogram(df, x='Subjectivity', nbins=40,
+    subjectivity_hist = aggregates.histogram('Subjectivity')
+    fig_subjectivity = px.histogram(x=subjectivity_hist.index, y=subjectivity_hist.values, histfunc='sum', nbins=40,
                                     title="Distribution of Subjectivity Scores",
                                     color_discrete_sequence=['#ff6b6b'],
-                                    labels={'Subjectivity': 'Subjectivity Score', 'count': 'Frequency'})
+                                    labels={'x': 'Subjectivity Score', 'y': 'Frequency'})
     fig_subjectivity.update_xaxes(title_text="Subjectivity Score")
     fig_subjectivity.update_yaxes(title_text="Number of Tweets")
     st.plotly_chart(fig_subjectivity, use_container_width=True)
@@ -267,11 +266,11 @@ if show_polarity_stats:
             <div class='metric-card'>
                 <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Polarity Statistics</div>
                 <div style='margin-top: 15px;'>
-                    <p style='margin: 8px 0;'><strong>Mean (Average):</strong> {df['Polarity'].mean():.3f}</p>
-                    <p style='margin: 8px 0;'><strong>Median (Middle Value):</strong> {df['Polarity'].median():.3f}</p>
-                    <p style='margin: 8px 0;'><strong>Standard Deviation:</strong> {df['Polarity'].std():.3f}</p>
-                    <p style='margin: 8px 0;'><strong>Minimum:</strong> {df['Polarity'].min():.3f}</p>
-                    <p style='margin: 8px 0;'><strong>Maximum:</strong> {df['Polarity'].max():.3f}</p>
+                    <p style='margin: 8px 0;'><strong>Mean (Average):</strong> {polarity_stats['mean']:.3f}</p>
+                    <p style='margin: 8px 0;'><strong>Median (Middle Value):</strong> {polarity_stats['median']:.3f}</p>
+                    <p style='margin: 8px 0;'><strong>Standard Deviation:</strong> {polarity_stats['std']:.3f}</p>
+                    <p style='margin: 8px 0;'><strong>Minimum:</strong> {polarity_stats['min']:.3f}</p>
+                    <p style='margin: 8px 0;'><strong>Maximum:</strong> {polarity_stats['max']:.3f}</p>
                 </div>
             </div>
         """, unsafe_allow_html=True)
@@ -282,11 +281,11 @@ if show_subjectivity_stats:
             <div class='metric-card'>
                 <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Subjectivity Statistics</div>
                 <div style='margin-top: 15px;'>
-                    <p style='margin: 8px 0;'><strong>Mean (Average):</strong> {df['Subjectivity'].mean():.3f}</p>
-                    <p style='margin: 8px 0;'><strong>Median (Middle Value):</strong> {df['Subjectivity'].median():.3f}</p>
-                    <p style='margin: 8px 0;'><strong>Standard Deviation:</strong> {df['Subjectivity'].std():.3f}</p>
-                    <p style='margin: 8px 0;'><strong>Minimum:</strong> {df['Subjectivity'].min():.3f}</p>
-                    <p style='margin: 8px 0;'><strong>Maximum:</strong> {df['Subjectivity'].max():.3f}</p>
+                    <p style='margin: 8px 0;'><strong>Mean (Average):</strong> {subjectivity_stats['mean']:.3f}</p>
+                    <p style='margin: 8px 0;'><strong>Median (Middle Value):</strong> {subjectivity_stats['median']:.3f}</p>
+                    <p style='margin: 8px 0;'><strong>Standard Deviation:</strong> {subjectivity_stats['std']:.3f}</p>
+                    <p style='margin: 8px 0;'><strong>Minimum:</strong> {subjectivity_stats['min']:.3f}</p>
+                    <p style='margin: 8px 0;'><strong>Maximum:</strong> {subjectivity_stats['max']:.3f}</p>
                 </div>
             </div>
         """, unsafe_allow_html=True)
@@ -306,25 +305,30 @@ st.markdown("""
 
 #
 
-# Interactive selection for scatter plot
-sentiment_filter = st.multiselect(
-    "Filter by Sentiment Type:",
-    df['Sentiment'].unique(),
-    default=df['Sentiment'].unique(),
-    key="sentiment_scatter"
-)
-
-filtered_scatter = df[df['Sentiment'].isin(sentiment_filter)]
-
-fig_scatter = px.scatter(filtered_scatter, x='Polarity', y='Subjectivity', 
-                         color='Sentiment',
-                         color_discrete_map={'Positive': '#2ecc71', 'Negative': '#e74c3c', 'Neutral': '#95a5a6'},
-                         title="Polarity vs Subjectivity: How Emotions are Expressed",
-                         labels={'Polarity': 'Polarity Score (Negative to Positive)', 
-                                'Subjectivity': 'Subjectivity Score (Factual to Opinion-Based)'},
-                         hover_data=['Text'])
-fig_scatter.update_layout(height=500)
-st.plotly_chart(fig_scatter, use_container_width=True)
+@st.fragment
+def sentiment_scatter(df):
+    # Changing the selection reruns only this section
+    # Interactive selection for scatter plot
+    sentiment_filter = st.multiselect(
+        "Filter by Sentiment Type:",
+        df['Sentiment'].unique(),
+        default=df['Sentiment'].unique(),
+        key="sentiment_scatter"
+    )
+
+    filtered_scatter = df[df['Sentiment'].isin(sentiment_filter)]
+
+    fig_scatter = px.scatter(filtered_scatter, x='Polarity', y='Subjectivity', 
+                             color='Sentiment',
+                             color_discrete_map={'Positive': '#2ecc71', 'Negative': '#e74c3c', 'Neutral': '#95a5a6'},
+                             title="Polarity vs Subjectivity: How Emotions are Expressed",
+                             labels={'Polarity': 'Polarity Score (Negative to Positive)', 
+                                    'Subjectivity': 'Subjectivity Score (Factual to Opinion-Based)'},
+                             hover_data=['Text'])
+    fig_scatter.update_layout(height=500)
+    st.plotly_chart(fig_scatter, use_container_width=True)
+
+sentiment_scatter(df)
 
 st.markdown("</div>", unsafe_allow_html=True)
 
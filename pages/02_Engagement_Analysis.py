@@ -3,7 +3,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from textblob import TextBlob
+from core.controls import load_served, sentiment_thresholds
+from core.watcher import current_version
+from core.sentiment import with_sentiment
 
 st.set_page_config(page_title="Engagement Analysis", layout="wide")
 
@@ -73,13 +75,6 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_and_process_data():
-    df = pd.read_csv("./Data/twitter_dataset.csv")
-    df['Sentiment'] = df['Text'].apply(lambda x: 'Positive' if TextBlob(str(x)).sentiment.polarity > 0.1 
-                                       else ('Negative' if TextBlob(str(x)).sentiment.polarity < -0.1 else 'Neutral'))
-    return df
-
 st.markdown("""
     <div class='page-header'>
         <h1>What Drives Engagement: Likes, Shares, and Reach</h1>
@@ -87,7 +82,13 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-df = load_and_process_data()
+negative_threshold, positive_threshold = sentiment_thresholds()
+aggregates = load_served('aggregates', current_version())
+likes_stats = aggregates.stats('Likes')
+retweets_stats = aggregates.stats('Retweets')
+by_sentiment = aggregates.labelled('codes', negative_threshold, positive_threshold)
+# The engagement scatter plots a uniform sample of the tweets
+df = with_sentiment(aggregates.sample, negative_threshold, positive_threshold)
 
 st.markdown("""
     <div class='story-text'>
@@ -116,7 +117,7 @@ with col1:
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Total Likes</div>
-            <div style='font-size: 2em; font-weight: bold; color: #e74c3c; margin: 10px 0;'>{df['Likes'].sum():,.0f}</div>
+            <div style='font-size: 2em; font-weight: bold; color: #e74c3c; margin: 10px 0;'>{likes_stats['sum']:,.0f}</div>
             <div style='color: #657786; font-size: 0.9em;'>expressions of support</div>
         </div>
     """, unsafe_allow_html=True)
@@ -125,7 +126,7 @@ with col2:
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Total Retweets</div>
-            <div style='font-size: 2em; font-weight: bold; color: #2ecc71; margin: 10px 0;'>{df['Retweets'].sum():,.0f}</div>
+            <div style='font-size: 2em; font-weight: bold; color: #2ecc71; margin: 10px 0;'>{retweets_stats['sum']:,.0f}</div>
             <div style='color: #657786; font-size: 0.9em;'>times amplified</div>
         </div>
     """, unsafe_allow_html=True)
@@ -134,7 +135,7 @@ with col3:
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Avg Likes/Tweet</div>
-            <div style='font-size: 2em; font-weight: bold; color: #1DA1F2; margin: 10px 0;'>{df['Likes'].mean():.0f}</div>
+            <div style='font-size: 2em; font-weight: bold; color: #1DA1F2; margin: 10px 0;'>{likes_stats['mean']:.0f}</div>
             <div style='color: #657786; font-size: 0.9em;'>typical response</div>
         </div>
     """, unsafe_allow_html=True)
@@ -143,7 +144,7 @@ with col4:
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Avg Retweets/Tweet</div>
-            <div style='font-size: 2em; font-weight: bold; color: #1DA1F2; margin: 10px 0;'>{df['Retweets'].mean():.0f}</div>
+            <div style='font-size: 2em; font-weight: bold; color: #1DA1F2; margin: 10px 0;'>{retweets_stats['mean']:.0f}</div>
             <div style='color: #657786; font-size: 0.9em;'>typical share rate</div>
         </div>
     """, unsafe_allow_html=True)
@@ -177,7 +178,7 @@ with col1:
     st.write("**Average Likes by Sentiment Type**")
     st.write("Which sentiment gets the most appreciation?")
     
-    likes_by_sentiment = df.groupby('Sentiment')['Likes'].mean().sort_values(ascending=False)
+    likes_by_sentiment = (by_sentiment['Likes'] / by_sentiment['Tweets']).sort_values(ascending=False)
     fig_likes = px.bar(x=likes_by_sentiment.index, y=likes_by_sentiment.values,
                        color=likes_by_sentiment.index,
                        color_discrete_map={'Positive': '#2ecc71', 'Negative': '#e74c3c', 'Neutral': '#95a5a6'},
@@ -192,7 +193,7 @@ with col2:
     st.write("**Average Retweets by Sentiment Type**")
     st.write("Which sentiment gets shared the most?")
     
-    rt_by_sentiment = df.groupby('Sentiment')['Retweets'].mean().sort_values(ascending=False)
+    rt_by_sentiment = (by_sentiment['Retweets'] / by_sentiment['Tweets']).sort_values(ascending=False)
     fig_rt = px.bar(x=rt_by_sentiment.index, y=rt_by_sentiment.values,
                     color=rt_by_sentiment.index,
                     color_discrete_map={'Positive': '#2ecc71', 'Negative': '#e74c3c', 'Neutral': '#95a5a6'},
@@ -202,10 +203,20 @@ with col2:
     st.plotly_chart(fig_rt, use_container_width=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
-st.markdown("""
+# A band reaching the end of the slider leaves no Positive (or Negative) tweets
+if 'Positive' not in likes_by_sentiment.index:
+    finding = "With this polarity band no tweets count as Positive, so there is nothing to compare."
+elif likes_by_sentiment.min() == 0:
+    finding = (f"Positive content averages {likes_by_sentiment['Positive']:.0f} likes, "
+               "while the lowest-performing sentiment type gets none.")
+else:
+    finding = (f"Positive content gets {(likes_by_sentiment['Positive'] / likes_by_sentiment.min() - 1) * 100:.0f}% "
+               "more likes than lower-performing sentiment types. This suggests audiences actively prefer "
+               "constructive, positive discussions over critical or neutral ones.")
+
+st.markdown(f"""
     <div class='insight-box'>
-        <strong>The Finding:</strong> """ + f"Positive content gets {(likes_by_sentiment['Positive'] / likes_by_sentiment.min() - 1) * 100:.0f}% more likes" + """ 
-        than lower-performing sentiment types. This suggests audiences actively prefer constructive, positive discussions over critical or neutral ones.
+        <strong>The Finding:</strong> {finding}
     </div>
 """, unsafe_allow_html=True)
 
@@ -223,24 +234,29 @@ st.markdown("""
 
 #
 
-# Interactive filter
-sentiment_filter = st.multiselect(
-    "Show me engagement for these sentiment types:",
-    df['Sentiment'].unique(),
-    default=df['Sentiment'].unique(),
-    key="engagement_scatter"
-)
-
-filtered_engagement = df[df['Sentiment'].isin(sentiment_filter)]
-
-fig_scatter = px.scatter(filtered_engagement, x='Retweets', y='Likes', 
-                         color='Sentiment',
-                         color_discrete_map={'Positive': '#2ecc71', 'Negative': '#e74c3c', 'Neutral': "#4fa7d3"},
-                         size='Likes',
-                         title="The Relationship: Retweets vs Likes (bubble size = like volume)",
-                         labels={'Retweets': 'Times Shared (Retweets)', 'Likes': 'Times Appreciated (Likes)'})
-fig_scatter.update_layout(height=500)
-st.plotly_chart(fig_scatter, use_container_width=True)
+@st.fragment
+def engagement_scatter(df):
+    # Changing the selection reruns only this section
+    # Interactive filter
+    sentiment_filter = st.multiselect(
+        "Show me engagement for these sentiment types:",
+        df['Sentiment'].unique(),
+        default=df['Sentiment'].unique(),
+        key="engagement_scatter"
+    )
+
+    filtered_engagement = df[df['Sentiment'].isin(sentiment_filter)]
+
+    fig_scatter = px.scatter(filtered_engagement, x='Retweets', y='Likes', 
+                             color='Sentiment',
+                             color_discrete_map={'Positive': '#2ecc71', 'Negative': '#e74c3c', 'Neutral': "#4fa7d3"},
+                             size='Likes',
+                             title="The Relationship: Retweets vs Likes (bubble size = like volume)",
+                             labels={'Retweets': 'Times Shared (Retweets)', 'Likes': 'Times Appreciated (Likes)'})
+    fig_scatter.update_layout(height=500)
+    st.plotly_chart(fig_scatter, use_container_width=True)
+
+engagement_scatter(df)
 
 st.markdown("</div>", unsafe_allow_html=True)
 
@@ -272,10 +288,12 @@ with col1:
     st.write("**Distribution of Likes**")
     st.write("How varied are like counts across tweets?")
     
-    fig_likes_dist = px.histogram(df, x='Likes', nbins=40,
+    likes_counts = aggregates.table('likes')['Tweets']
+    fig_likes_dist = px.histogram(x=likes_counts.index.get_level_values('Likes'), y=likes_counts.values,
+                                  histfunc='sum', nbins=40,
                                   title="Spread of Likes Across Conversations",
                                   color_discrete_sequence=['#ff6b6b'],
-                                  labels={'Likes': 'Number of Likes', 'count': 'Number of Tweets'})
+                                  labels={'x': 'Number of Likes', 'y': 'Number of Tweets'})
     fig_likes_dist.update_xaxes(title_text="Likes per Tweet")
     fig_likes_dist.update_yaxes(title_text="Number of Tweets")
     st.plotly_chart(fig_likes_dist, use_container_width=True)
@@ -286,10 +304,12 @@ with col2:
     st.write("**Distribution of Retweets**")
     st.write("How varied are retweet counts across tweets?")
     
-    fig_rt_dist = px.histogram(df, x='Retweets', nbins=40,
+    retweets_counts = aggregates.table('retweets')['Tweets']
+    fig_rt_dist = px.histogram(x=retweets_counts.index.get_level_values('Retweets'), y=retweets_counts.values,
+                               histfunc='sum', nbins=40,
                                title="Spread of Retweets Across Conversations",
                                color_discrete_sequence=['#00b894'],
-                               labels={'Retweets': 'Number of Retweets', 'count': 'Number of Tweets'})
+                               labels={'x': 'Number of Retweets', 'y': 'Number of Tweets'})
     fig_rt_dist.update_xaxes(title_text="Retweets per Tweet")
     fig_rt_dist.update_yaxes(title_text="Number of Tweets")
     st.plotly_chart(fig_rt_dist, use_container_width=True)
@@ -316,7 +336,7 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-top_tweets = df.nlargest(10, 'Likes')[['Text', 'Likes', 'Retweets', 'Sentiment', 'Username']]
+top_tweets = with_sentiment(aggregates.top, negative_threshold, positive_threshold)[['Text', 'Likes', 'Retweets', 'Sentiment', 'Username']]
 
 for idx, (i, row) in enumerate(top_tweets.iterrows(), 1):
     sentiment_color = {'Positive': '#2ecc71', 'Negative': '#e74c3c', 'Neutral': '#95a5a6'}[row['Sentiment']]
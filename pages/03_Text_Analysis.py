@@ -2,11 +2,12 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from collections import Counter
-import re
-from textblob import TextBlob
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+from wordcloud import STOPWORDS
+from core.aggregates import code_range
+from core.controls import load_served, sentiment_thresholds
+from core.clouds import word_cloud
+from core.watcher import current_version
+from core.sentiment import with_sentiment
 
 st.set_page_config(page_title="Text Analysis", layout="wide")
 
@@ -76,24 +77,6 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-def clean_text(text):
-    text = str(text).lower()
-    text = re.sub(r'@\w+', '', text)
-    text = re.sub(r'#\w+', '', text)
-    text = re.sub(r'http\S+', '', text)
-    text = re.sub(r'\d+', '', text)
-    text = re.sub(r'[^\w\s]', '', text)
-    return ' '.join(text.split())
-
-@st.cache_data
-def load_and_process_data():
-    df = pd.read_csv("./Data/twitter_dataset.csv")
-    df['Cleaned_Text'] = df['Text'].apply(clean_text)
-    df['Text_Length'] = df['Cleaned_Text'].apply(lambda x: len(x.split()))
-    df['Sentiment'] = df['Text'].apply(lambda x: 'Positive' if TextBlob(str(x)).sentiment.polarity > 0.1 
-                                       else ('Negative' if TextBlob(str(x)).sentiment.polarity < -0.1 else 'Neutral'))
-    return df
-
 st.markdown("""
     <div class='page-header'>
         <h1>What Are People Talking About? Unveiling Topics and Themes</h1>
@@ -101,7 +84,13 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-df = load_and_process_data()
+negative_threshold, positive_threshold = sentiment_thresholds()
+version = current_version()
+aggregates = load_served('aggregates', version)
+length_stats = aggregates.stats('Text_Length')
+word_freq = aggregates.word_counts()
+# The length box plot draws from the uniform sample kept with the aggregates
+df = with_sentiment(aggregates.sample, negative_threshold, positive_threshold)
 
 st.markdown("""
     <div class='story-text'>
@@ -129,7 +118,7 @@ with col1:
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Avg Words/Tweet</div>
-            <div style='font-size: 2em; font-weight: bold; color: #1DA1F2; margin: 10px 0;'>{df['Text_Length'].mean():.0f}</div>
+            <div style='font-size: 2em; font-weight: bold; color: #1DA1F2; margin: 10px 0;'>{length_stats['mean']:.0f}</div>
             <div style='color: #657786; font-size: 0.9em;'>words on average</div>
         </div>
     """, unsafe_allow_html=True)
@@ -138,7 +127,7 @@ with col2:
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Longest Tweet</div>
-            <div style='font-size: 2em; font-weight: bold; color: #1DA1F2; margin: 10px 0;'>{df['Text_Length'].max():.0f}</div>
+            <div style='font-size: 2em; font-weight: bold; color: #1DA1F2; margin: 10px 0;'>{length_stats['max']:.0f}</div>
             <div style='color: #657786; font-size: 0.9em;'>words in longest</div>
         </div>
     """, unsafe_allow_html=True)
@@ -147,14 +136,13 @@ with col3:
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Shortest Tweet</div>
-            <div style='font-size: 2em; font-weight: bold; color: #1DA1F2; margin: 10px 0;'>{df['Text_Length'].min():.0f}</div>
+            <div style='font-size: 2em; font-weight: bold; color: #1DA1F2; margin: 10px 0;'>{length_stats['min']:.0f}</div>
             <div style='color: #657786; font-size: 0.9em;'>words in shortest</div>
         </div>
     """, unsafe_allow_html=True)
 
 with col4:
-    all_words = ' '.join(df['Cleaned_Text']).split()
-    unique_words = len(set(all_words))
+    unique_words = len(word_freq)
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Unique Words</div>
@@ -179,10 +167,12 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-fig_length = px.histogram(df, x='Text_Length', nbins=30,
+length_counts = aggregates.table('lengths')['Tweets']
+fig_length = px.histogram(x=length_counts.index.get_level_values('Text_Length'), y=length_counts.values,
+                          histfunc='sum', nbins=30,
                           title="How Many Words in a Typical Tweet?",
                           color_discrete_sequence=['#1DA1F2'],
-                          labels={'Text_Length': 'Number of Words', 'count': 'Number of Tweets'})
+                          labels={'x': 'Number of Words', 'y': 'Number of Tweets'})
 fig_length.update_xaxes(title_text="Words per Tweet")
 fig_length.update_yaxes(title_text="Number of Tweets")
 st.plotly_chart(fig_length, use_container_width=True)
@@ -202,20 +192,22 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-all_words = ' '.join(df['Cleaned_Text']).split()
-word_freq = Counter(all_words)
+@st.fragment
+def top_words_chart(word_freq):
+    # Moving the slider reruns only this section
+    top_n = st.slider("How many top words would you like to see?", 5, 50, 20, step=5)
+    top_words = word_freq.nlargest(top_n).to_dict()
 
-top_n = st.slider("How many top words would you like to see?", 5, 50, 20, step=5)
-top_words = dict(word_freq.most_common(top_n))
+    fig_words = px.bar(x=list(top_words.keys()), y=list(top_words.values()),
+                       title=f"The {top_n} Most Frequently Used Words",
+                       color=list(range(len(top_words))),
+                       color_continuous_scale='Blues',
+                       labels={'x': 'Word', 'y': 'Frequency'})
+    fig_words.update_xaxes(tickangle=-45)
+    fig_words.update_yaxes(title_text="How Many Times it Appears")
+    st.plotly_chart(fig_words, use_container_width=True)
 
-fig_words = px.bar(x=list(top_words.keys()), y=list(top_words.values()),
-                   title=f"The {top_n} Most Frequently Used Words",
-                   color=list(range(len(top_words))),
-                   color_continuous_scale='Blues',
-                   labels={'x': 'Word', 'y': 'Frequency'})
-fig_words.update_xaxes(tickangle=-45)
-fig_words.update_yaxes(title_text="How Many Times it Appears")
-st.plotly_chart(fig_words, use_container_width=True)
+top_words_chart(word_freq)
 
 st.markdown("</div>", unsafe_allow_html=True)
 
@@ -229,6 +221,60 @@ st.markdown("""
 
 st.markdown("---")
 
+# Common Phrases
+st.subheader("The Phrases People Keep Repeating")
+
+st.markdown("""
+    <div class='story-text'>
+        Single words lose their context: "customer" and "service" mean more together. These are the two- and
+        three-word phrases that come up most often, overall or within one sentiment - recurring phrases point to
+        the specific topics, complaints and compliments behind the conversation.
+    </div>
+""", unsafe_allow_html=True)
+
+
+@st.fragment
+def top_phrases_chart(version, negative_threshold, positive_threshold):
+    # Changing the phrase length or sentiment reruns only this section
+    col1, col2 = st.columns(2)
+    with col1:
+        size = st.radio("Phrase length", [2, 3], format_func=lambda n: f"{n} words", horizontal=True)
+    with col2:
+        sentiment = st.radio("Sentiment", ['All', 'Positive', 'Negative', 'Neutral'], horizontal=True)
+    sentiment = None if sentiment == 'All' else sentiment
+
+    # Phrase counts are a store of their own, only built once this section asks
+    with st.spinner("Counting phrases..."):
+        counts = load_served('phrases', version)
+    codes = code_range(negative_threshold, positive_threshold, sentiment)
+    error = counts.error_bound(*codes)
+    phrases = counts.counts(size, *codes)
+    # Estimates within the error bound may be all error; phrases made only of
+    # stopwords ("of the", "in the") say nothing about the topic
+    phrases = phrases[phrases > error]
+    phrases = phrases[[not set(phrase.split()) <= STOPWORDS for phrase in phrases.index]].head(15)
+    if phrases.empty:
+        st.info("No phrases found")
+        return
+
+    fig_phrases = px.bar(x=phrases.values, y=phrases.index, orientation='h',
+                         title=f"The Most Common {size}-Word Phrases",
+                         color=phrases.values,
+                         color_continuous_scale='Blues',
+                         labels={'x': 'Occurrences' if error == 0 else 'Estimated Occurrences', 'y': 'Phrase'})
+    fig_phrases.update_yaxes(autorange='reversed')
+    fig_phrases.update_layout(height=500, showlegend=False)
+    st.plotly_chart(fig_phrases, use_container_width=True)
+    if error:
+        st.caption(f"Counts are estimated in bounded memory: each may be too high by up to {error:,.0f} "
+                   f"(98% confidence), never too low. Phrases counted no higher than that are left out.")
+
+st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
+top_phrases_chart(version, negative_threshold, positive_threshold)
+st.markdown("</div>", unsafe_allow_html=True)
+
+st.markdown("---")
+
 # Word Cloud Visualization
 st.subheader("Visual Theme: Word Cloud")
 
@@ -241,18 +287,14 @@ st.markdown("""
 
 st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
 
-all_text = ' '.join(df['Cleaned_Text'])
-wordcloud = WordCloud(width=900, height=400, 
-                      background_color='white',
-                      colormap='Blues',
-                      relative_scaling=0.5).generate(all_text)
+overall_cloud = word_cloud(aggregates, version, 'Blues')
 
-fig, ax = plt.subplots(figsize=(12, 5))
-ax.imshow(wordcloud, interpolation='bilinear')
-ax.axis('off')
-st.pyplot(fig, use_container_width=True)
+if overall_cloud is not None:
+    st.image(overall_cloud, use_container_width=True)
 
-st.write("Overall Theme Cloud - Larger words are discussed more frequently")
+    st.write("Overall Theme Cloud - Larger words are discussed more frequently")
+else:
+    st.info("No words found")
 st.markdown("</div>", unsafe_allow_html=True)
 
 st.markdown("---")
@@ -268,27 +310,23 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-tabs = st.tabs(["Positive Conversations", "Negative Conversations", "Neutral Conversations"])
+# Only the open tab's cloud is rendered; switching tabs reruns the page
+tabs = st.tabs(["Positive Conversations", "Negative Conversations", "Neutral Conversations"],
+               key='sentiment_cloud_tab', on_change='rerun')
 
 sentiments = ['Positive', 'Negative', 'Neutral']
 colors = ['Greens', 'Reds', 'Greys']
 
 for tab, sentiment, color in zip(tabs, sentiments, colors):
+    if not tab.open:
+        continue
     with tab:
         st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
         
-        sentiment_text = ' '.join(df[df['Sentiment'] == sentiment]['Cleaned_Text'])
+        wordcloud = word_cloud(aggregates, version, color, negative_threshold, positive_threshold, sentiment)
         
-        if len(sentiment_text.split()) > 0:
-            wordcloud = WordCloud(width=900, height=400,
-                                 background_color='white',
-                                 colormap=color,
-                                 relative_scaling=0.5).generate(sentiment_text)
-            
-            fig, ax = plt.subplots(figsize=(12, 5))
-            ax.imshow(wordcloud, interpolation='bilinear')
-            ax.axis('off')
-            st.pyplot(fig, use_container_width=True)
+        if wordcloud is not None:
+            st.image(wordcloud, use_container_width=True)
             
             st.write(f"What {sentiment} conversations discuss most")
         else:
@@ -3,7 +3,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from textblob import TextBlob
+from core.controls import load_served, sentiment_thresholds
+from core.watcher import current_version
 
 st.set_page_config(page_title="User Analysis", layout="wide")
 
@@ -82,13 +83,6 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_and_process_data():
-    df = pd.read_csv("./Data/twitter_dataset.csv")
-    df['Sentiment'] = df['Text'].apply(lambda x: 'Positive' if TextBlob(str(x)).sentiment.polarity > 0.1 
-                                       else ('Negative' if TextBlob(str(x)).sentiment.polarity < -0.1 else 'Neutral'))
-    return df
-
 st.markdown("""
     <div class='page-header'>
         <h1>Meet the Players: Understanding Key Users and Influencers</h1>
@@ -96,7 +90,7 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-df = load_and_process_data()
+users = load_served('aggregates', current_version()).labelled('users', *sentiment_thresholds())
 
 st.markdown("""
     <div class='story-text'>
@@ -110,14 +104,18 @@ st.markdown("""
 st.markdown("---")
 
 # User Statistics
-user_stats = df.groupby('Username').agg({
-    'Tweet_ID': 'count',
-    'Likes': ['sum', 'mean'],
-    'Retweets': ['sum', 'mean'],
-    'Sentiment': lambda x: (x == 'Positive').sum()
+totals = users.groupby(level='Username').sum()
+# A band reaching the end of the slider leaves no Positive tweets at all
+positive = users['Tweets'].unstack('Sentiment', fill_value=0).get('Positive', 0)
+user_stats = pd.DataFrame({
+    'Total_Tweets': totals['Tweets'],
+    'Total_Likes': totals['Likes'],
+    'Avg_Likes': totals['Likes'] / totals['Tweets'],
+    'Total_Retweets': totals['Retweets'],
+    'Avg_Retweets': totals['Retweets'] / totals['Tweets'],
+    'Positive_Tweets': positive,
 }).round(2)
 
-user_stats.columns = ['Total_Tweets', 'Total_Likes', 'Avg_Likes', 'Total_Retweets', 'Avg_Retweets', 'Positive_Tweets']
 user_stats = user_stats.sort_values('Total_Likes', ascending=False)
 
 # Key Metrics
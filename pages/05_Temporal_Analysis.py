@@ -3,7 +3,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from textblob import TextBlob
+from core.controls import date_range, load_served, sentiment_thresholds
+from core.dataset import in_range
+from core.watcher import current_version
 
 st.set_page_config(page_title="Temporal Analysis", layout="wide")
 
@@ -73,18 +75,6 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_and_process_data():
-    df = pd.read_csv("./Data/twitter_dataset.csv")
-    df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-    df['Date'] = df['Timestamp'].dt.date
-    df['Month'] = df['Timestamp'].dt.to_period('M')
-    df['Hour'] = df['Timestamp'].dt.hour
-    df['DayOfWeek'] = df['Timestamp'].dt.day_name()
-    df['Sentiment'] = df['Text'].apply(lambda x: 'Positive' if TextBlob(str(x)).sentiment.polarity > 0.1 
-                                       else ('Negative' if TextBlob(str(x)).sentiment.polarity < -0.1 else 'Neutral'))
-    return df
-
 st.markdown("""
     <div class='page-header'>
         <h1>Timing is Everything: Trends, Patterns, and Peak Moments</h1>
@@ -92,7 +82,17 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-df = load_and_process_data()
+aggregates = load_served('aggregates', current_version())
+negative_threshold, positive_threshold = sentiment_thresholds()
+start, end = date_range()
+# Tweets, Likes and Retweets per day, hour and sentiment, within the chosen dates
+by_time = aggregates.labelled('time', negative_threshold, positive_threshold)
+by_time = by_time[in_range(by_time.index.get_level_values('Date'), start, end)]
+daily = by_time.groupby(level='Date').sum()
+
+if daily.empty:
+    st.info("No tweets in the selected date range")
+    st.stop()
 
 st.markdown("""
     <div class='story-text'>
@@ -117,7 +117,7 @@ st.markdown("""
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    start_date = df['Timestamp'].min().date()
+    start_date = daily.index.min().date()
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Start Date</div>
@@ -127,7 +127,7 @@ with col1:
     """, unsafe_allow_html=True)
 
 with col2:
-    end_date = df['Timestamp'].max().date()
+    end_date = daily.index.max().date()
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>End Date</div>
@@ -137,17 +137,17 @@ with col2:
     """, unsafe_allow_html=True)
 
 with col3:
-    date_range = (df['Timestamp'].max() - df['Timestamp'].min()).days
+    days_covered = (end_date - start_date).days
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Duration</div>
-            <div style='font-size: 2em; font-weight: bold; color: #1DA1F2; margin: 10px 0;'>{date_range}</div>
+            <div style='font-size: 2em; font-weight: bold; color: #1DA1F2; margin: 10px 0;'>{days_covered}</div>
             <div style='color: #657786; font-size: 0.85em;'>days analyzed</div>
         </div>
     """, unsafe_allow_html=True)
 
 with col4:
-    avg_daily = len(df) / max(date_range, 1)
+    avg_daily = daily['Tweets'].sum() / max(days_covered, 1)
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Daily Average</div>
@@ -171,7 +171,7 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-tweets_by_date = df.groupby('Date').size()
+tweets_by_date = daily['Tweets']
 
 st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
 fig_volume = px.line(x=tweets_by_date.index, y=tweets_by_date.values,
@@ -205,7 +205,7 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-sentiment_by_date = df.groupby(['Date', 'Sentiment']).size().unstack(fill_value=0)
+sentiment_by_date = by_time['Tweets'].groupby(level=['Date', 'Sentiment'], observed=True).sum().unstack(fill_value=0)
 
 st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
 fig_sentiment = px.line(sentiment_by_date,
@@ -246,7 +246,7 @@ with col1:
     st.write("**Best Hours of the Day**")
     st.write("When do most conversations happen?")
     
-    tweets_by_hour = df.groupby('Hour').size()
+    tweets_by_hour = by_time['Tweets'].groupby(level='Hour').sum()
     fig_hour = px.bar(x=tweets_by_hour.index, y=tweets_by_hour.values,
                       title="Tweet Activity by Hour of Day",
                       color=tweets_by_hour.values,
@@ -262,7 +262,7 @@ with col2:
     st.write("Does the day of week matter for engagement?")
     
     day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    tweets_by_day = df.groupby('DayOfWeek').size()
+    tweets_by_day = daily['Tweets'].groupby(daily.index.day_name()).sum()
     tweets_by_day = tweets_by_day.reindex([d for d in day_order if d in tweets_by_day.index])
     
     fig_day = px.bar(x=tweets_by_day.index, y=tweets_by_day.values,
@@ -297,37 +297,43 @@ st.markdown("""
 
 st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
 
-metric_choice = st.radio(
-    "Which engagement metric interests you?",
-    ["Average Likes", "Average Retweets", "Both"],
-    horizontal=True
-)
-
-monthly_likes = df.groupby('Month')['Likes'].mean()
-monthly_retweets = df.groupby('Month')['Retweets'].mean()
-
-if metric_choice == "Average Likes":
-    fig_engage = px.line(x=monthly_likes.index.astype(str), y=monthly_likes.values,
-                         title="Average Likes per Tweet Over Time",
-                         markers=True,
-                         color_discrete_sequence=['#ff6b6b'],
-                         labels={'x': 'Month', 'y': 'Average Likes'})
-elif metric_choice == "Average Retweets":
-    fig_engage = px.line(x=monthly_retweets.index.astype(str), y=monthly_retweets.values,
-                         title="Average Retweets per Tweet Over Time",
-                         markers=True,
-                         color_discrete_sequence=['#00b894'],
-                         labels={'x': 'Month', 'y': 'Average Retweets'})
-else:
-    fig_engage = go.Figure()
-    fig_engage.add_trace(go.Scatter(x=monthly_likes.index.astype(str), y=monthly_likes.values,
-                                    mode='lines+markers', name='Avg Likes', line=dict(color='#ff6b6b')))
-    fig_engage.add_trace(go.Scatter(x=monthly_retweets.index.astype(str), y=monthly_retweets.values,
-                                    mode='lines+markers', name='Avg Retweets', line=dict(color='#00b894')))
-    fig_engage.update_layout(title="Engagement Trends Over Time", hovermode='x unified')
-
-fig_engage.update_xaxes(tickangle=-45)
-st.plotly_chart(fig_engage, use_container_width=True)
+monthly = daily.groupby(daily.index.to_period('M')).sum()
+monthly_likes = monthly['Likes'] / monthly['Tweets']
+monthly_retweets = monthly['Retweets'] / monthly['Tweets']
+
+@st.fragment
+def engagement_trend(monthly_likes, monthly_retweets):
+    # Switching the metric reruns only this section
+    metric_choice = st.radio(
+        "Which engagement metric interests you?",
+        ["Average Likes", "Average Retweets", "Both"],
+        horizontal=True
+    )
+
+    if metric_choice == "Average Likes":
+        fig_engage = px.line(x=monthly_likes.index.astype(str), y=monthly_likes.values,
+                             title="Average Likes per Tweet Over Time",
+                             markers=True,
+                             color_discrete_sequence=['#ff6b6b'],
+                             labels={'x': 'Month', 'y': 'Average Likes'})
+    elif metric_choice == "Average Retweets":
+        fig_engage = px.line(x=monthly_retweets.index.astype(str), y=monthly_retweets.values,
+                             title="Average Retweets per Tweet Over Time",
+                             markers=True,
+                             color_discrete_sequence=['#00b894'],
+                             labels={'x': 'Month', 'y': 'Average Retweets'})
+    else:
+        fig_engage = go.Figure()
+        fig_engage.add_trace(go.Scatter(x=monthly_likes.index.astype(str), y=monthly_likes.values,
+                                        mode='lines+markers', name='Avg Likes', line=dict(color='#ff6b6b')))
+        fig_engage.add_trace(go.Scatter(x=monthly_retweets.index.astype(str), y=monthly_retweets.values,
+                                        mode='lines+markers', name='Avg Retweets', line=dict(color='#00b894')))
+        fig_engage.update_layout(title="Engagement Trends Over Time", hovermode='x unified')
+
+    fig_engage.update_xaxes(tickangle=-45)
+    st.plotly_chart(fig_engage, use_container_width=True)
+
+engagement_trend(monthly_likes, monthly_retweets)
 
 st.markdown("</div>", unsafe_allow_html=True)
 
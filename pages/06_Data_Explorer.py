@@ -2,8 +2,11 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from textblob import TextBlob
 import io
+from core.controls import date_range, sentiment_thresholds
+from core.sentiment import with_sentiment
+from core.shared import frame_view
+from core.watcher import current_version
 
 st.set_page_config(page_title="Data Explorer", layout="wide")
 
@@ -73,12 +76,12 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv("./Data/twitter_dataset.csv")
-    df['Sentiment'] = df['Text'].apply(lambda x: 'Positive' if TextBlob(str(x)).sentiment.polarity > 0.1 
-                                       else ('Negative' if TextBlob(str(x)).sentiment.polarity < -0.1 else 'Neutral'))
-    return df
+COLUMNS = ['Tweet_ID', 'Username', 'Text', 'Retweets', 'Likes', 'Timestamp', 'Polarity']
+
+def load_data(columns, start, end):
+    # A view of the one frame all sessions share for the current dataset
+    # version: only its date range, and no copy of the rows
+    return frame_view(current_version(), columns, start, end)
 
 st.markdown("""
     <div class='page-header'>
@@ -87,7 +90,12 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-df = load_data()
+negative_threshold, positive_threshold = sentiment_thresholds()
+df = with_sentiment(load_data(COLUMNS, *date_range()), negative_threshold, positive_threshold).drop(columns=['Polarity'])
+
+if df.empty:
+    st.info("No tweets in the selected date range")
+    st.stop()
 
 st.markdown("""
     <div class='story-text'>
@@ -135,7 +143,7 @@ with col4:
     st.markdown(f"""
         <div class='metric-card'>
             <div style='color: #657786; font-size: 0.85em; font-weight: 600; text-transform: uppercase;'>Time Span</div>
-            <div style='font-size: 1.2em; font-weight: bold; color: #0f1419; margin: 10px 0;'>{df['Timestamp'].min()[:10]} to {df['Timestamp'].max()[:10]}</div>
+            <div style='font-size: 1.2em; font-weight: bold; color: #0f1419; margin: 10px 0;'>{df['Timestamp'].min():%Y-%m-%d} to {df['Timestamp'].max():%Y-%m-%d}</div>
             <div style='color: #657786; font-size: 0.9em;'>analysis period</div>
         </div>
     """, unsafe_allow_html=True)
@@ -209,14 +217,12 @@ with col6:
 st.markdown("</div>", unsafe_allow_html=True)
 
 # Apply Filters
-filtered_df = df.copy()
-
+# df shares its data with other sessions: filter into one mask, and only
+# take the rows when it actually drops some
+keep = df['Sentiment'].isin(sentiment_filter) & (df['Likes'] >= min_likes) & (df['Retweets'] >= min_retweets)
 if selected_users:
-    filtered_df = filtered_df[filtered_df['Username'].isin(selected_users)]
-
-filtered_df = filtered_df[filtered_df['Sentiment'].isin(sentiment_filter)]
-filtered_df = filtered_df[filtered_df['Likes'] >= min_likes]
-filtered_df = filtered_df[filtered_df['Retweets'] >= min_retweets]
+    keep &= df['Username'].isin(selected_users)
+filtered_df = df if keep.all() else df[keep]
 
 # Sort Data
 if sort_by == "Likes (Most First)":
@@ -336,7 +342,9 @@ with col2:
         st.info("Excel export requires openpyxl: pip install openpyxl")
 
 with col3:
-    json_data = filtered_df.to_json(orient='records', indent=2)
+    # Same timestamp strings as the source CSV rather than epoch milliseconds
+    json_data = filtered_df.assign(Timestamp=filtered_df['Timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')) \
+        .to_json(orient='records', indent=2)
     st.download_button(
         label="Download as JSON",
         data=json_data,
@@ -1,8 +1,9 @@
 # pages/07_Tweet_Analyzer.py
 import streamlit as st
 import pandas as pd
-from textblob import TextBlob
 import plotly.graph_objects as go
+from core.controls import sentiment_thresholds
+from core.score_cache import get_cache
 
 st.set_page_config(page_title="Tweet Analyzer", layout="wide")
 
@@ -115,6 +116,8 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
+negative_threshold, positive_threshold = sentiment_thresholds()
+
 st.markdown("""
     <div class='story-text'>
         <strong>Craft the perfect message.</strong> Before you post, understand how your tweet will be perceived. 
@@ -169,17 +172,15 @@ if analyze_button and tweet_text:
     st.session_state.analyzed_tweet = tweet_text
 
 # Show analysis results only if a tweet has been analyzed
-blob = TextBlob(tweet_text)
 if st.session_state.analyzed_tweet:
-    polarity = blob.sentiment.polarity
-    subjectivity = blob.sentiment.subjectivity
+    polarity, subjectivity = get_cache().score_text(tweet_text)
     
     # Determine sentiment
-    if polarity > 0.1:
+    if polarity > positive_threshold:
         sentiment = "Positive"
         sentiment_color = "#2ecc71"
         sentiment_emoji = "Positive"
-    elif polarity < -0.1:
+    elif polarity < negative_threshold:
         sentiment = "Negative"
         sentiment_color = "#e74c3c"
         sentiment_emoji = "Negative"
@@ -369,14 +370,12 @@ if st.session_state.analyzed_tweet:
     
     
     # Analyze rewritten version
-    rewritten_blob = TextBlob(rewritten)
-    rewritten_polarity = rewritten_blob.sentiment.polarity
-    rewritten_subjectivity = rewritten_blob.sentiment.subjectivity
+    rewritten_polarity, rewritten_subjectivity = get_cache().score_text(rewritten)
     
-    if rewritten_polarity > 0.1:
+    if rewritten_polarity > positive_threshold:
         rewritten_sentiment = "Positive"
         rewritten_color = "#2ecc71"
-    elif rewritten_polarity < -0.1:
+    elif rewritten_polarity < negative_threshold:
         rewritten_sentiment = "Negative"
         rewritten_color = "#e74c3c"
     else:
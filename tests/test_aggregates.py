@@ -0,0 +1,57 @@
+# tests/test_aggregates.py - Aggregates of rows the dataset layer accepts
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.aggregates import COLUMNS, Aggregates, load_aggregates
+from core.feature_store import iter_features
+
+DATASET = os.path.join(os.path.dirname(__file__), os.pardir, 'Data', 'twitter_dataset.csv')
+
+
+def test_rows_without_timestamp(tmp_path):
+    # The dataset keeps rows without a Timestamp (in the null partition); only
+    # the per-day and per-hour table leaves them out
+    frame = pd.read_csv(DATASET, nrows=300)
+    frame.to_csv(tmp_path / 'dated.csv', index=False)
+    frame.loc[5, 'Timestamp'] = None
+    frame.to_csv(tmp_path / 'undated.csv', index=False)
+
+    dated = load_aggregates(str(tmp_path / 'dated.csv'), str(tmp_path / 'dated'))
+    undated = load_aggregates(str(tmp_path / 'undated.csv'), str(tmp_path / 'undated'))
+    assert undated.rows == 300
+    assert undated.sentiment_counts(-0.05, 0.05).equals(dated.sentiment_counts(-0.05, 0.05))
+    # Rows are batched by month, so the undated row changes the batches and the last bits of the moments
+    assert undated.stats('Likes') == pytest.approx(dated.stats('Likes'), rel=1e-12)
+    for name in ('codes', 'users', 'subjectivity', 'lengths', 'likes', 'retweets', 'words'):
+        assert undated.table(name).sort_index().equals(dated.table(name).sort_index()), name
+    assert undated.table('time')['Tweets'].sum() == 299
+
+
+def test_chunked_texts(tmp_path):
+    # Batches concatenated across dataset parts hold Arrow arrays of several chunks
+    pd.read_csv(DATASET, nrows=300).to_csv(tmp_path / 'tweets.csv', index=False)
+    frames = list(iter_features(COLUMNS, str(tmp_path / 'tweets.csv'), str(tmp_path / 'cache')))
+    assert len(frames) > 1
+    chunked = Aggregates().update(pd.concat(frames))
+    batched = Aggregates()
+    for frame in frames:
+        batched.update(frame)
+    assert chunked.word_counts().sort_index().equals(batched.word_counts().sort_index())
+
+
+def test_stats_of_large_clustered_values(tmp_path):
+    # A sum of squares loses the variance of values far from 0 and close together
+    pd.read_csv(DATASET, nrows=3000).to_csv(tmp_path / 'tweets.csv', index=False)
+    frame = pd.concat(iter_features(COLUMNS, str(tmp_path / 'tweets.csv'), str(tmp_path / 'cache')))
+    frame['Likes'] = 10 ** 12 + np.random.default_rng(0).integers(0, 10, size=len(frame))
+    aggregates = Aggregates()
+    for start in range(0, len(frame), 700):
+        aggregates.update(frame.iloc[start:start + 700])
+    stats, likes = aggregates.stats('Likes'), frame['Likes'].astype(float)
+    assert stats['mean'] == pytest.approx(likes.mean(), rel=1e-15)
+    # A float64 at 10**12 is only good to about 1e-4, so the merged means and deltas are too
+    assert stats['std'] == pytest.approx(likes.std(), rel=1e-6)
+    assert (stats['min'], stats['max'], stats['sum']) == (likes.min(), likes.max(), likes.sum())
@@ -0,0 +1,21 @@
+# tests/test_lexicon.py - LexiconScorer against TextBlob on the shipped dataset
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.lexicon import TOLERANCE, LexiconScorer
+from core.sentiment import score_texts
+
+DATASET = os.path.join(os.path.dirname(__file__), os.pardir, 'Data', 'twitter_dataset.csv')
+
+
+def test_dataset():
+    texts = pd.read_csv(DATASET, usecols=['Text'])['Text']
+    expected = score_texts(texts, workers=1)
+    scores = LexiconScorer().score(texts)
+    for column in ('Polarity', 'Subjectivity'):
+        error = np.abs(scores[column].to_numpy() - expected[column].to_numpy())
+        assert error.max() <= TOLERANCE, (column, texts[error.argmax()])
+    mismatched = scores['Sentiment'].to_numpy() != expected['Sentiment'].to_numpy()
+    assert not mismatched.any(), texts[mismatched].head().tolist()
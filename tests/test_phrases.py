@@ -0,0 +1,22 @@
+# tests/test_phrases.py - PhraseCounts against counting every n-gram
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from core.phrases import PhraseCounts
+
+TEXTS = ['a b c', 'b c d', 'a b c d', '', 'c']
+
+
+def test_chunked_texts():
+    # Feature columns read across dataset parts are Arrow arrays of several chunks
+    texts = pd.Series(pd.arrays.ArrowExtensionArray(pa.chunked_array([TEXTS[:2], TEXTS[2:]])))
+    codes = np.array([0, 1, 2, 3, 4])
+    counts = PhraseCounts(401).update(texts, codes)
+    expected = Counter(' '.join(words[i:i + 2]) for words in map(str.split, TEXTS) for i in range(len(words) - 1))
+    assert counts.counts(2).to_dict() == dict(expected)
+    assert counts.counts(2, 1, 3).to_dict() == {'b c': 2, 'c d': 2, 'a b': 1}
+    assert counts.counts(3).to_dict() == {'a b c': 2, 'b c d': 2}
+    assert counts.error_bound() == 0
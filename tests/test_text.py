@@ -0,0 +1,37 @@
+# tests/test_text.py - clean_texts against the cleaner it replaced
+import os
+
+import pandas as pd
+import pytest
+
+from core.benchmark import legacy_clean, legacy_clean_texts
+from core.text import clean_text, clean_texts
+
+DATASET = os.path.join(os.path.dirname(__file__), os.pardir, 'Data', 'twitter_dataset.csv')
+
+# Inputs where clean_texts' shortcuts could drift from the five substitutions
+CLEAN_EDGE_CASES = ['@@user', 'a#b@c', '#a@b', 'http@abc/x', 'xhttp@abc', '@http://x', 'x#1http://a',
+                    'ht1tp://x', 'http://x.com/@user/#tag', '1@a2', '#!a', 'Café №5 ½ ２０２３ naïve',
+                    'tab\tnew\nline\xa0nbsp\u2028sep\x1cfs', '__init__ _@_ #_', 'ÉCOLE İstanbul ß', '', None]
+
+
+def assert_same_as_legacy(texts):
+    texts = pd.Series(texts)
+    expected, expected_lengths = legacy_clean_texts(texts)
+    cleaned, lengths = clean_texts(texts)
+    assert cleaned.tolist() == expected.tolist()
+    assert lengths.tolist() == expected_lengths.tolist()
+    assert cleaned.index.equals(texts.index) and lengths.index.equals(texts.index)
+
+
+@pytest.mark.parametrize('text', CLEAN_EDGE_CASES)
+def test_edge_cases(text):
+    assert_same_as_legacy([text])
+    assert clean_text(text) == legacy_clean(text)
+
+
+def test_dataset():
+    texts = pd.read_csv(DATASET, usecols=['Text'])['Text']
+    assert_same_as_legacy(texts)
+    # Real tweets are full of mentions, hashtags and links, which take the regex path
+    assert_same_as_legacy(texts.astype(str) + " @user #tag http://t.co/x1y2")